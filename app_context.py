@@ -0,0 +1,205 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Modules that register components when imported (importing them is cheap; building is lazy)
+# Builds run concurrently during warm-up; catalog fetches each hold one pooled connection meanwhile
+WARMUP_WORKERS = int(os.environ.get("CHATBOT_WARMUP_WORKERS", "8"))
+
+COMPONENT_MODULES = ("db", "entity_fetch", "vocabulary", "nlp_setup", "missplet_model", "pattern", "phrase_automaton")
+
+class Component:
+
+    """
+        A lazily built piece of application state (connection pool, catalog list, model, index...).
+
+        Args:
+            name (str): Unique component name.
+            build (callable): Zero-argument function returning the component value.
+            deps (tuple): Names of components the build reads; they are built first.
+            optional (bool): The application can run without it (is_ready() ignores it).
+    """
+
+    def __init__(self, name, build, deps=(), optional=False):
+        self.name = name
+        self.build = build
+        self.deps = tuple(deps)
+        self.optional = optional
+        self.value = None
+        self.state = "pending"  # pending -> building -> ready | failed
+        self.started = None  # perf_counter() at the start of the last build
+        self.seconds = None  # Build time of the last successful build
+        self.error = None
+        self.lock = threading.RLock()
+
+class AppContext:
+
+    """
+        Registry of lazily initialized components with an explicit warm-up phase.
+
+        Nothing is built at import time: a component is built the first time it is requested
+        with get(), or ahead of time by warm_up(), which builds independent components in
+        parallel. readiness() reports the state and timing of each one.
+    """
+
+    def __init__(self):
+        self.components = {}
+        self.warm_up_started = None
+        self.warm_up_seconds = None
+
+    def register(self, name, build, deps=(), optional=False):
+        self.components[name] = Component(name, build, deps, optional)
+
+    def get(self, name):
+        component = self.components[name]
+        if component.state == "ready":  # Fast path without locking
+            return component.value
+        with component.lock:
+            if component.state != "ready":
+                for dep in component.deps:
+                    self.get(dep)
+                component.state = "building"
+                start = component.started = time.perf_counter()
+                try:
+                    value = component.build()
+                except Exception as e:
+                    component.state, component.error = "failed", e
+                    raise
+                component.value, component.error = value, None
+                component.seconds = time.perf_counter() - start
+                component.state = "ready"
+        return component.value
+
+    def get_many(self, *names):
+        """Returns several component values from one consistent state (never straddling a swap())."""
+        for name in names:
+            self.get(name)
+        components = [self.components[name] for name in sorted(set(names))]
+        for component in components:
+            component.lock.acquire()
+        try:
+            return tuple(self.components[name].value for name in names)
+        finally:
+            for component in components:
+                component.lock.release()
+
+    def set(self, name, value):
+        """Replaces the value of a component (e.g. a refreshed index or a local stand-in)."""
+        self.swap({name: value})
+
+    def swap(self, values):
+        """Replaces several component values so readers never see a half-updated set."""
+        components = [self.components[name] for name in sorted(values)]  # Same lock order as get_many()
+        for component in components:
+            component.lock.acquire()
+        try:
+            for component in components:
+                component.value, component.error = values[component.name], None
+                component.state = "ready"
+        finally:
+            for component in components:
+                component.lock.release()
+
+    def reset(self, names=None):
+        """Drops built values so they are rebuilt on next use."""
+        for name in names if names is not None else list(self.components):
+            component = self.components[name]
+            with component.lock:
+                component.value, component.state, component.seconds, component.error = None, "pending", None, None
+
+    def _with_deps(self, names):
+        needed, stack = set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.components[name].deps)
+        return needed
+
+    def _build(self, name):
+        try:
+            self.get(name)
+            return None
+        except Exception as e:
+            print(f"Error initializing {name}: {e}")
+            return e
+
+    def warm_up(self, names=None, workers=WARMUP_WORKERS):
+        """
+            Builds the given components (default: all) and their dependencies; returns readiness().
+
+            Components are scheduled as soon as all their dependencies are ready, on up to workers
+            threads, so independent fetches and model builds overlap. A component whose dependency
+            failed is marked failed without being attempted.
+        """
+        self.warm_up_started = time.perf_counter()
+        needed = self._with_deps(names if names is not None else list(self.components))
+        waiting = {
+            name: {dep for dep in self.components[name].deps if self.components[dep].state != "ready"}
+            for name in needed if self.components[name].state != "ready"
+        }
+        with ThreadPoolExecutor(max(1, workers), thread_name_prefix="warm-up") as executor:
+            running = {}
+            while waiting or running:
+                for name in [name for name, deps in waiting.items() if not deps]:
+                    del waiting[name]
+                    running[executor.submit(self._build, name)] = name
+                if not running:
+                    break  # Only components waiting on failed dependencies are left
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    if future.result() is None:
+                        for deps in waiting.values():
+                            deps.discard(name)
+                        continue
+                    # Fail everything downstream of the failed component
+                    failed = [name]
+                    while failed:
+                        failed_name = failed.pop()
+                        for dependent in [n for n, deps in waiting.items() if failed_name in deps]:
+                            del waiting[dependent]
+                            component = self.components[dependent]
+                            component.state, component.error = "failed", RuntimeError(f"dependency {failed_name} failed")
+                            failed.append(dependent)
+        self.warm_up_seconds = time.perf_counter() - self.warm_up_started
+        return self.readiness()
+
+    def readiness(self):
+        def offset(c):
+            # Build start relative to the last warm-up, to show what ran concurrently
+            if c.started is None or self.warm_up_started is None or c.started < self.warm_up_started:
+                return None
+            return c.started - self.warm_up_started
+        return {
+            name: {"state": c.state, "seconds": c.seconds, "started": offset(c), "optional": c.optional, "error": str(c.error) if c.error else None}
+            for name, c in self.components.items()
+        }
+
+    def is_ready(self, names=None):
+        return all(
+            self.components[name].state == "ready"
+            for name in (names if names is not None else [n for n, c in self.components.items() if not c.optional])
+        )
+
+context = AppContext()
+
+def load_components():
+    for module in COMPONENT_MODULES:
+        importlib.import_module(module)
+
+def warm_up(names=None):
+    load_components()
+    return context.warm_up(names)
+
+if __name__ == "__main__":
+    readiness = warm_up()
+    print(f"{'component':24} {'state':8} {'start':>8} {'build':>8}")
+    for name, status in sorted(readiness.items(), key=lambda item: (item[1]["started"] is None, item[1]["started"] or 0)):
+        started = f"{status['started']:.2f}s" if status["started"] is not None else "-"
+        seconds = f"{status['seconds']:.2f}s" if status["seconds"] is not None else "-"
+        print(f"{name:24} {status['state']:8} {started:>8} {seconds:>8} {status['error'] or ''}")
+    total = sum(status["seconds"] or 0 for status in readiness.values())
+    print(f"Warm-up took {context.warm_up_seconds:.2f}s wall time for {total:.2f}s of builds")
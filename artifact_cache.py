@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import numpy as np
+
+# Bump when the layout of any cached artifact changes so old files are ignored.
+CACHE_VERSION = 1
+CACHE_DIR = os.environ.get("CHATBOT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+CACHE_ENABLED = os.environ.get("CHATBOT_CACHE", "1") != "0"
+
+def content_hash(*parts):
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for part in parts:
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+def _artifact_path(name, key, suffix):
+    return os.path.join(CACHE_DIR, f"{name}-{key}{suffix}")
+
+def _write_atomic(path, write):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _prune(name, suffix, keep_path):
+    # Drop artifacts of the same name built from an older catalog.
+    prefix = f"{name}-"
+    for filename in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, filename)
+        if filename.startswith(prefix) and filename.endswith(suffix) and path != keep_path and "-" not in filename[len(prefix):]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def cached_artifact(name, key, build, save, load, suffix):
+    """Returns the artifact stored under (name, key), building and saving it on a miss."""
+    if not CACHE_ENABLED:
+        return build()
+
+    path = _artifact_path(name, key, suffix)
+    if os.path.exists(path):
+        try:
+            return load(path)
+        except Exception as e:
+            print(f"Warning: Discarding unreadable cache file {path}: {e}")
+
+    artifact = build()
+    try:
+        _write_atomic(path, lambda tmp_path: save(artifact, tmp_path))
+        _prune(name, suffix, path)
+    except OSError as e:
+        print(f"Warning: Could not write cache file {path}: {e}")
+    return artifact
+
+def _save_array(array, path):
+    with open(path, "wb") as f:
+        np.save(f, np.ascontiguousarray(array))
+
+def cached_array(name, key, build):
+    # Arrays are memory-mapped read-only on load so workers share the page cache.
+    return cached_artifact(name, key, build, _save_array, lambda path: np.load(path, mmap_mode="r"), ".npy")
+
+def _save_object(obj, path):
+    with open(path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load_object(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def cached_object(name, key, build):
+    return cached_artifact(name, key, build, _save_object, _load_object, ".pkl")
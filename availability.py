@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from app_context import context
+import db  # noqa: F401  (registers the connection pool component)
+from db import CAR_DETAIL_DB, CAR_PART_DB, fetch_all
+
+logger = logging.getLogger(__name__)
+
+# Which sub-categories fit which vehicle models: (vehicle_model.id, sub_category id) pairs from car_part_spares_db.
+# The parts schema is site-specific, so the query is configurable.
+FITMENT_QUERY = os.environ.get(
+    "CHATBOT_FITMENT_QUERY",
+    "SELECT DISTINCT vehicle_model_id, sub_category_id FROM part_fitment"
+)
+MODELS_QUERY = "SELECT vm.id, v.make_name, vm.model_name FROM vehicle_model vm JOIN vehicle_make v ON vm.vehicle_make_id = v.id"
+SUBCATEGORIES_QUERY = "SELECT sc.sub_category_id, sc.sub_category_name, c.category_name FROM sub_category sc JOIN category c ON sc.category_id = c.category_id"
+REFRESH_INTERVAL = float(os.environ.get("CHATBOT_AVAILABILITY_REFRESH_INTERVAL", "300"))  # Seconds; 0 disables
+
+def _key(name):
+    return str(name).strip().lower()
+
+def _bitmap(bits, size):
+    # Set in a byte buffer and converted once; OR-ing into an int would copy it for every bit
+    buffer = bytearray((size + 7) // 8)
+    for bit in bits:
+        buffer[bit >> 3] |= 1 << (bit & 7)
+    return int.from_bytes(buffer, "little")
+
+class AvailabilityIndex:
+
+    """
+        Precomputed make/model x sub-category fitment index.
+
+        Each model has one bitmap (a Python int) with bit i set when sub-category i fits it,
+        and each category has a mask of its sub-category bits, so availability checks and
+        "everything available in this category" queries are a few integer operations.
+
+        Args:
+            models (list): (model id, make name, model name) rows.
+            subcategories (list): (sub-category id, sub-category name, category name) rows.
+            fitments (list): (model id, sub-category id) pairs.
+    """
+
+    def __init__(self, models, subcategories, fitments):
+        self.subcategory_names = []  # bit -> sub-category name
+        self.subcategory_bits = {}  # lowercased sub-category name -> bit
+        self.category_masks = {}  # lowercased category name -> mask of its sub-categories
+        bit_for_id = {}
+        for sub_category_id, name, category in subcategories:
+            bit = self.subcategory_bits.setdefault(_key(name), len(self.subcategory_names))
+            if bit == len(self.subcategory_names):
+                self.subcategory_names.append(name)
+            bit_for_id[sub_category_id] = bit
+            self.category_masks[_key(category)] = self.category_masks.get(_key(category), 0) | (1 << bit)
+
+        model_keys = {model_id: (_key(make), _key(model)) for model_id, make, model in models}
+        bits_by_model = {}
+        for model_id, sub_category_id in fitments:
+            if model_id in model_keys and sub_category_id in bit_for_id:
+                bits_by_model.setdefault(model_keys[model_id], set()).add(bit_for_id[sub_category_id])
+        self.bitmaps = {key: _bitmap(bits, len(self.subcategory_names)) for key, bits in bits_by_model.items()}
+        # Sub-categories with at least one fitment row; the others have no data for any vehicle
+        self.covered = _bitmap(set().union(*bits_by_model.values()), len(self.subcategory_names))
+        self.models = set(model_keys.values())
+        self.fitment_count = sum(len(bits) for bits in bits_by_model.values())
+
+    def is_available(self, make, model, subcategory):
+        """True/False, or None when there is no fitment data for the model or the sub-category."""
+        key = (_key(make), _key(model))
+        bit = self.subcategory_bits.get(_key(subcategory))
+        if key not in self.bitmaps or bit is None or not self.covered >> bit & 1:
+            return None
+        return bool(self.bitmaps[key] >> bit & 1)
+
+    def available_subcategories(self, make, model, category=None):
+        """
+            Sub-categories that fit the model (optionally only within one category), or None when there
+            is no fitment data for the model or the category is unknown. Sub-categories without any
+            fitment data are listed too, like is_available() treats them.
+        """
+        key = (_key(make), _key(model))
+        if key not in self.bitmaps or (category is not None and _key(category) not in self.category_masks):
+            return None
+        bitmap = self.bitmaps[key] | ~self.covered & ((1 << len(self.subcategory_names)) - 1)
+        if category is not None:
+            bitmap &= self.category_masks[_key(category)]
+        names = []
+        while bitmap:
+            low = bitmap & -bitmap
+            names.append(self.subcategory_names[low.bit_length() - 1])
+            bitmap ^= low
+        return names
+
+    def stats(self):
+        return {"models": len(self.models), "subcategories": len(self.subcategory_names), "fitments": self.fitment_count}
+
+def build_availability_index():
+    start = time.perf_counter()
+    index = AvailabilityIndex(
+        fetch_all(CAR_DETAIL_DB, MODELS_QUERY, name="availability_models"),
+        fetch_all(CAR_PART_DB, SUBCATEGORIES_QUERY, name="availability_subcategories"),
+        fetch_all(CAR_PART_DB, FITMENT_QUERY, name="availability_fitments"),
+    )
+    logger.info("Availability index built in %.2fs: %s", time.perf_counter() - start, index.stats())
+    return index
+
+# Optional: without fitment data the app still runs and availability checks fall back
+context.register("availability_index", build_availability_index, deps=("db_pools",), optional=True)
+
+def get_availability_index():
+    """The index, or None when it cannot be built (e.g. no fitment table); callers then fall back."""
+    if context.components["availability_index"].state == "failed":
+        return None  # Not retried per request; the refresher tries again
+    try:
+        return context.get("availability_index")
+    except Exception as e:
+        logger.warning("Availability index unavailable: %s", e)
+        return None
+
+class AvailabilityRefresher:
+
+    """
+        Rebuilds the availability index every interval seconds on a background thread and swaps it
+        in; lookups keep using the previous index until the new one is complete.
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                context.set("availability_index", build_availability_index())
+            except Exception:
+                logger.exception("Error refreshing availability index")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="availability-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def start_availability_refresher():
+    if REFRESH_INTERVAL <= 0:
+        return None
+    return AvailabilityRefresher().start()
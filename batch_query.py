@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from app_context import warm_up
+from entity_handling import check_subcategory_availability, fetch_subcategories, get_available_subcategories, get_category_for_subcategory, get_make_for_model, resolve_make, resolve_model
+from pattern import extract_entities_batch
+
+def answer(entities):
+    """
+        Runs the chat.py answer logic for one query's entities without prompting.
+
+        Returns (resolved entities, status, answer text). The status names what the interactive
+        bot would have asked for next ("needs_category", "invalid_make", ...) or is "answered".
+    """
+    make, model = entities.get("MAKE"), entities.get("MODEL")
+    category, sub_category = entities.get("CATEGORY"), entities.get("SUB_CATEGORY")
+
+    if model and not make:
+        make = get_make_for_model(model)
+    if make and not (make := resolve_make(make)):
+        status = "invalid_make"
+    elif not category and not sub_category:
+        status = "needs_category"
+    elif not make:
+        status = "needs_make"
+    elif not model:
+        status = "needs_model"
+    elif not (model := resolve_model(make, model)):
+        status = "invalid_model"
+    else:
+        status = "answered"
+
+    resolved = {"MAKE": make, "MODEL": model, "CATEGORY": category, "SUB_CATEGORY": sub_category}
+    if status != "answered":
+        return resolved, status, None
+
+    if sub_category:
+        resolved["CATEGORY"] = category or get_category_for_subcategory(sub_category)
+        is_available = check_subcategory_availability(make, model, sub_category)
+        text = f"{'Yes' if is_available else 'Sorry'}, '{sub_category}' is {'available' if is_available else 'not available'} for {make} {model}."
+    else:
+        subcategories = get_available_subcategories(make, model, category)
+        if subcategories is None:
+            subcategories = fetch_subcategories(category)
+        text = f"Subcategories under {category} for {make} {model}:\n- " + "\n- ".join(subcategories) if subcategories else f"No subcategories found for {category} for {make} {model}"
+    return resolved, status, text
+
+def process_chunk(records):
+    """Extracts entities for a chunk of {"query": ...} records in one batch and answers each one."""
+    queries = [record.get("query", "") for record in records]
+    try:
+        all_entities = extract_entities_batch(queries)
+    except Exception as e:
+        return [{**record, "error": f"Entity extraction failed: {e}"} for record in records]
+
+    results = []
+    for record, entities in zip(records, all_entities):
+        try:
+            resolved, status, text = answer(entities)
+            results.append({**record, "entities": entities, "resolved": resolved, "status": status, "answer": text})
+        except Exception as e:
+            results.append({**record, "entities": entities, "error": str(e)})
+    return results
+
+def read_chunks(lines, chunk_size):
+    """
+        Yields chunks of (record, failure) pairs. failure is None for a valid record, otherwise the
+        {"line": ..., "error": ...} record written in its place; it is kept apart from the input
+        record so that fields of the input (even one named "error") never change what is processed.
+    """
+    chunk = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record, error = None, None
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            error = f"Invalid JSON: {e}"
+        if isinstance(record, str):
+            record = {"query": record}
+        elif error is None and not isinstance(record, dict):
+            error = f"Expected a JSON object or string, got {type(record).__name__}"
+        elif error is None and not isinstance(record.get("query", ""), str):
+            error = f"\"query\" must be a string, got {type(record['query']).__name__}"
+        chunk.append((record, {"line": line_number, "error": error} if error else None))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _process_records(entries):
+    # Records that failed to parse are passed through as their error record instead of being queried
+    valid = [record for record, failure in entries if failure is None]
+    results = iter(process_chunk(valid) if valid else [])
+    return [failure if failure is not None else next(results) for _, failure in entries]
+
+def _init_worker():
+    warm_up()
+
+def run(lines, out, chunk_size=256, workers=1, executor_kind="process"):
+    """
+        Streams JSONL results for JSONL queries, in input order.
+
+        Chunks are processed by a pool of workers with at most 2 * workers chunks in flight, so
+        memory stays bounded however large the input is. workers=1 runs in-process.
+    """
+    count = 0
+    if workers <= 1:
+        warm_up()
+        for chunk in read_chunks(lines, chunk_size):
+            for result in _process_records(chunk):
+                out.write(json.dumps(result) + "\n")
+            count += len(chunk)
+        return count
+
+    if executor_kind == "process":
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker)
+    else:
+        warm_up()  # Threads share this process's models and connection pools
+        executor = ThreadPoolExecutor(workers, thread_name_prefix="batch")
+    with executor:
+        in_flight = deque()
+        for chunk in read_chunks(lines, chunk_size):
+            in_flight.append(executor.submit(_process_records, chunk))
+            while len(in_flight) >= 2 * workers:
+                results = in_flight.popleft().result()
+                out.writelines(json.dumps(result) + "\n" for result in results)
+                count += len(results)
+        while in_flight:
+            results = in_flight.popleft().result()
+            out.writelines(json.dumps(result) + "\n" for result in results)
+            count += len(results)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Run JSONL queries through entity extraction and the catalog lookups, writing JSONL results.")
+    parser.add_argument("input", help='JSONL file of {"query": ...} records (extra fields are copied to the output); "-" for stdin')
+    parser.add_argument("-o", "--output", help="output JSONL file (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="queries extracted together in one batch")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count = run(source, out, args.chunk_size, args.workers, args.executor)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"Processed {count} queries in {elapsed:.1f}s ({count / elapsed:.1f} queries/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
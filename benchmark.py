@@ -0,0 +1,339 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+# Local stand-ins -----------------------------------------------------------------------------
+
+class SQLiteCursor:
+    # Accepts the MySQL "%s" parameter style used throughout the code base
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        self.cursor.execute(query.replace("%s", "?"), params)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def close(self):
+        self.cursor.close()
+
+class SQLiteConnection:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def ping(self, **kwargs):
+        pass
+
+    def cursor(self):
+        return SQLiteCursor(self.conn.cursor())
+
+    def close(self):
+        self.conn.close()
+
+class SQLitePool:
+    """Stand-in for MySQLConnectionPool over a local SQLite file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def get_connection(self):
+        return SQLiteConnection(self.path)
+
+class HashingEmbedder:
+    """Deterministic random unit vectors per string; stands in for the sentence-transformer."""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, convert_to_numpy=True):
+        vectors = np.stack([
+            np.random.default_rng(abs(hash(text)) % (2 ** 32)).standard_normal(self.dim).astype(np.float32)
+            for text in texts
+        ]) if len(texts) else np.zeros((0, self.dim), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+class StubOllama:
+    """Replaces the ollama module in llm.py: streams a canned answer with a fixed per-token delay."""
+
+    def __init__(self, tokens=40, token_delay=0.0):
+        self.tokens = tokens
+        self.token_delay = token_delay
+
+    def chat(self, model, messages, options=None, stream=False):
+        for i in range(self.tokens):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield {"message": {"content": f"tok{i} "}}
+
+def _random_name(rng, length):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(length))
+
+def seed_catalog(directory, makes, models_per_make, categories, subcategories_per_category, seed=0, fitment_rate=0.3):
+    """Creates car_detail_db / car_part_spares_db stand-ins and returns the generated names."""
+    rng = random.Random(seed)
+    make_names = sorted({_random_name(rng, rng.randint(4, 9)) for _ in range(makes)})
+    model_names = {make: sorted({_random_name(rng, rng.randint(4, 10)) for _ in range(models_per_make)}) for make in make_names}
+    category_names = sorted({_random_name(rng, rng.randint(5, 9)) for _ in range(categories)})
+    sub_category_names = {
+        category: sorted({f"{_random_name(rng, rng.randint(4, 8))} {_random_name(rng, rng.randint(3, 6))}" for _ in range(subcategories_per_category)})
+        for category in category_names
+    }
+
+    detail_path = os.path.join(directory, "car_detail_db.sqlite")
+    with sqlite3.connect(detail_path) as conn:
+        conn.executescript("""
+            CREATE TABLE vehicle_make (id INTEGER PRIMARY KEY, make_name TEXT);
+            CREATE TABLE vehicle_model (id INTEGER PRIMARY KEY, model_name TEXT, vehicle_make_id INTEGER);
+            CREATE TABLE vehicle_variant (id INTEGER PRIMARY KEY, variant_name TEXT);
+            CREATE TABLE vehicle_year (id INTEGER PRIMARY KEY, release_year TEXT);
+            CREATE TABLE vehicle_fuel_type (id INTEGER PRIMARY KEY, fuel_type_name TEXT);
+            CREATE INDEX idx_model_name ON vehicle_model (model_name);
+            CREATE INDEX idx_make_name ON vehicle_make (make_name);
+        """)
+        for make_id, make in enumerate(make_names, 1):
+            conn.execute("INSERT INTO vehicle_make VALUES (?, ?)", (make_id, make))
+            conn.executemany("INSERT INTO vehicle_model (model_name, vehicle_make_id) VALUES (?, ?)", [(m, make_id) for m in model_names[make]])
+        conn.executemany("INSERT INTO vehicle_variant (variant_name) VALUES (?)", [(v,) for v in ("lxi", "vxi", "zxi", "base", "sport")])
+        conn.executemany("INSERT INTO vehicle_year (release_year) VALUES (?)", [(str(y),) for y in range(2000, 2025)])
+        conn.executemany("INSERT INTO vehicle_fuel_type (fuel_type_name) VALUES (?)", [(f,) for f in ("petrol", "diesel", "cng", "electric")])
+
+    parts_path = os.path.join(directory, "car_part_spares_db.sqlite")
+    with sqlite3.connect(parts_path) as conn:
+        conn.executescript("""
+            CREATE TABLE category (category_id INTEGER PRIMARY KEY, category_name TEXT);
+            CREATE TABLE sub_category (sub_category_id INTEGER PRIMARY KEY, sub_category_name TEXT, category_id INTEGER);
+            CREATE INDEX idx_sub_category_name ON sub_category (sub_category_name);
+            CREATE TABLE part_fitment (vehicle_model_id INTEGER, sub_category_id INTEGER);
+        """)
+        for category_id, category in enumerate(category_names, 1):
+            conn.execute("INSERT INTO category VALUES (?, ?)", (category_id, category))
+            conn.executemany("INSERT INTO sub_category (sub_category_name, category_id) VALUES (?, ?)", [(s, category_id) for s in sub_category_names[category]])
+        # Each sub-category fits a random fitment_rate share of the models
+        model_count = sum(len(models) for models in model_names.values())
+        sub_category_count = sum(len(subs) for subs in sub_category_names.values())
+        conn.executemany("INSERT INTO part_fitment VALUES (?, ?)", [
+            (model_id, sub_category_id)
+            for model_id in range(1, model_count + 1) for sub_category_id in range(1, sub_category_count + 1)
+            if rng.random() < fitment_rate
+        ])
+
+    return {"detail": detail_path, "parts": parts_path, "makes": make_names, "models": model_names,
+            "categories": category_names, "sub_categories": sub_category_names}
+
+def _typo(rng, word, rate):
+    if len(word) > 3 and rng.random() < rate:
+        i = rng.randrange(len(word) - 1)
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word
+
+def generate_queries(catalog, count, typo_rate=0.3, seed=1):
+    rng = random.Random(seed)
+    templates = [
+        "do you have {sub} for {make} {model}",
+        "i need {sub} for my {model}",
+        "{category} parts for {make}",
+        "is {sub} available for {make} {model}",
+        "{model} {sub}",
+    ]
+    queries = []
+    for _ in range(count):
+        make = rng.choice(catalog["makes"])
+        category = rng.choice(catalog["categories"])
+        values = {
+            "make": make, "model": rng.choice(catalog["models"][make]), "category": category,
+            "sub": rng.choice(catalog["sub_categories"][category]),
+        }
+        query = rng.choice(templates).format(**values)
+        queries.append(" ".join(_typo(rng, word, typo_rate) for word in query.split()))
+    return queries
+
+# Measurement -----------------------------------------------------------------------------------
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def measure(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return result
+
+    def report(self):
+        rows = {}
+        for stage, samples in self.samples.items():
+            values = np.array(samples) * 1000
+            rows[stage] = {
+                "count": len(samples),
+                "mean_ms": float(values.mean()),
+                "p50_ms": float(np.percentile(values, 50)),
+                "p95_ms": float(np.percentile(values, 95)),
+                "p99_ms": float(np.percentile(values, 99)),
+                "per_second": float(len(samples) / values.sum() * 1000) if values.sum() else float("inf"),
+            }
+        return rows
+
+def session_memory_footprint(create, turns, extract, sessions=200):
+    """Average Python-heap KB per session after replaying the same turns into many session memories."""
+    entities = [extract(query) for query in turns]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for _ in range(sessions):
+        memory = create()
+        for turn_entities in entities:
+            memory.update_memory(turn_entities)
+        kept.append(memory)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {"kb_per_session": used / sessions / 1024}
+
+def peak_memory_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is KiB on Linux
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="chatbot-bench-")
+    # Artifacts are cached in the scratch dir unless told otherwise, so runs do not pollute .cache/
+    os.environ.setdefault("CHATBOT_CACHE_DIR", args.cache_dir or os.path.join(workdir, "cache"))
+
+    # Imported late so CHATBOT_CACHE_DIR is honoured
+    from app_context import WARMUP_WORKERS, context, load_components
+    from db import CAR_DETAIL_DB, CAR_PART_DB
+    import catalog_cache
+
+    catalog = seed_catalog(workdir, args.makes, args.models_per_make, args.categories, args.subcategories, args.seed)
+    load_components()
+    context.set("db_pools", {CAR_DETAIL_DB: SQLitePool(catalog["detail"]), CAR_PART_DB: SQLitePool(catalog["parts"])})
+    if args.fake_embeddings:
+        context.set("embedding_model", HashingEmbedder())
+
+    import availability  # noqa: F401  (so warm-up also times the fitment index)
+    start = time.perf_counter()
+    readiness = context.warm_up(workers=args.warmup_workers or WARMUP_WORKERS)
+    warm_up_seconds = time.perf_counter() - start
+
+    import entity_handling
+    import llm
+    from memory_backends import create_session_memory
+    from pattern import ENTITY_LISTS, extract_entities
+    from preprocess import process_input_with_spelling_correction
+
+    llm.ollama = StubOllama(tokens=args.llm_tokens, token_delay=args.llm_token_delay)
+
+    queries = generate_queries(catalog, args.queries, args.typo_rate, args.seed + 1)
+    if args.query_file:
+        with open(args.query_file) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    entity_types = list(ENTITY_LISTS.keys()) + ["AVAILABLE_SUBCATEGORIES"]
+    # Every backend sees the same turns; the first one drives the lookups below
+    memories = {name: create_session_memory(entity_types, backend=name) for name in args.memory_backends}
+
+    timer = StageTimer()
+    start = time.perf_counter()
+    for turn, query in enumerate(queries):
+        if turn % args.session_turns == 0:
+            for memory in memories.values():
+                memory.clear()
+        timer.measure("spelling_correction", process_input_with_spelling_correction, query)
+        entities = timer.measure("extract_entities", extract_entities, query)
+
+        recalled = []
+        for name, memory in memories.items():
+            timer.measure(f"memory_update[{name}]", memory.update_memory, entities)
+            recalled.append(timer.measure(f"memory_recall[{name}]", memory.get_all_entities))
+        remembered = recalled[0]
+
+        make = entities.get("MAKE") or remembered.get("MAKE")
+        model = entities.get("MODEL") or remembered.get("MODEL")
+        if model and not make:
+            make = timer.measure("sql_make_for_model", entity_handling.get_make_for_model, model)
+        if make:
+            timer.measure("sql_models_for_make", entity_handling.get_available_models, make)
+        if entities.get("CATEGORY"):
+            timer.measure("sql_subcategories", entity_handling.fetch_subcategories, entities["CATEGORY"])
+        if entities.get("SUB_CATEGORY"):
+            timer.measure("sql_category_for_subcategory", entity_handling.get_category_for_subcategory, entities["SUB_CATEGORY"])
+            is_available = timer.measure("availability", entity_handling.check_subcategory_availability, make, model, entities["SUB_CATEGORY"])
+            response_text = f"{'Yes' if is_available else 'Sorry'}, '{entities['SUB_CATEGORY']}' is {'available' if is_available else 'not available'} for {make} {model}."
+            timer.measure("llm_enhancement", lambda: "".join(llm.stream_enhancement(query, response_text)))
+    total_seconds = time.perf_counter() - start
+
+    return {
+        "catalog": {"makes": args.makes, "models_per_make": args.models_per_make, "categories": args.categories, "subcategories_per_category": args.subcategories},
+        "queries": len(queries),
+        "warm_up_seconds": warm_up_seconds,
+        "warm_up": {name: status["seconds"] for name, status in readiness.items()},
+        "warm_up_started": {name: status["started"] for name, status in readiness.items()},
+        "turns_per_second": len(queries) / total_seconds if total_seconds else float("inf"),
+        "peak_memory_mb": peak_memory_mb(),
+        "stages": timer.report(),
+        "memory_backends": {
+            name: session_memory_footprint(lambda name=name: create_session_memory(entity_types, backend=name), queries[:args.session_turns], extract_entities)
+            for name in args.memory_backends
+        },
+        "catalog_cache": catalog_cache.cache_stats(),
+        "response_cache": llm.response_cache.stats(),
+    }
+
+def print_report(result):
+    print(f"Catalog: {result['catalog']}, {result['queries']} queries")
+    total = sum(seconds or 0 for seconds in result["warm_up"].values())
+    print(f"Warm-up: {result['warm_up_seconds']:.2f}s wall, {total:.2f}s of builds")
+    for name, seconds in result["warm_up"].items():
+        if seconds is not None:
+            started = result["warm_up_started"][name]
+            started = f"+{started * 1000:.1f} ms" if started is not None else ""
+            print(f"  {name:28} {seconds * 1000:10.1f} ms {started:>14}")
+    print(f"\n{'stage':30} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for stage, row in result["stages"].items():
+        print(f"{stage:30} {row['count']:7d} {row['mean_ms']:9.3f} {row['p50_ms']:9.3f} {row['p95_ms']:9.3f} {row['p99_ms']:9.3f} {row['per_second']:10.1f}")
+    print("\nSession memory per session (Python heap; torch tensors not included):")
+    for name, row in result["memory_backends"].items():
+        print(f"  {name:28} {row['kb_per_session']:10.1f} KB")
+    print(f"\nThroughput: {result['turns_per_second']:.1f} turns/s, peak RSS {result['peak_memory_mb']:.1f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency benchmark against a local stand-in catalog and a stubbed Ollama.")
+    parser.add_argument("--makes", type=int, default=50)
+    parser.add_argument("--models-per-make", type=int, default=20)
+    parser.add_argument("--categories", type=int, default=30)
+    parser.add_argument("--subcategories", type=int, default=20, help="sub-categories per category")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--query-file", help="replay these queries (one per line) instead of generated ones")
+    parser.add_argument("--typo-rate", type=float, default=0.3)
+    parser.add_argument("--session-turns", type=int, default=5, help="turns per simulated session before memory is cleared")
+    parser.add_argument("--memory-backends", type=lambda value: value.split(","), default=["slot", "gru", "gru_pool"], help="comma-separated session memory backends to compare")
+    parser.add_argument("--llm-tokens", type=int, default=40)
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="seconds per stubbed Ollama token")
+    parser.add_argument("--warmup-workers", type=int, help="concurrent warm-up builds (default CHATBOT_WARMUP_WORKERS; 1 = sequential)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use hashed random embeddings instead of the sentence-transformer")
+    parser.add_argument("--cache-dir", help="artifact cache directory (default: a fresh temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args()
+    if args.fake_embeddings and args.cache_dir:
+        parser.error("--fake-embeddings would store fake embeddings in --cache-dir; use the default scratch cache")
+
+    result = run(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
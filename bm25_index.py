@@ -0,0 +1,99 @@
+import math
+from collections import Counter, defaultdict
+import numpy as np
+
+class SparseBM25:
+
+    """
+        Okapi BM25 over a postings-list index.
+
+        Scores match rank_bm25.BM25Okapi, but a query only touches the postings of its own
+        terms instead of scoring every document.
+
+        Args:
+            corpus (list): Tokenized documents (lists of terms).
+            k1 (float), b (float), epsilon (float): BM25Okapi parameters.
+    """
+
+    def __init__(self, corpus, k1=1.5, b=0.75, epsilon=0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.corpus_size = len(corpus)
+        self.doc_len = np.array([len(doc) for doc in corpus], dtype=np.float32)
+        self.avgdl = float(self.doc_len.mean()) if self.corpus_size else 0.0
+
+        postings = defaultdict(lambda: ([], []))
+        for doc_id, doc in enumerate(corpus):
+            for term, freq in Counter(doc).items():
+                postings[term][0].append(doc_id)
+                postings[term][1].append(freq)
+        self.postings = {
+            term: (np.array(ids, dtype=np.int32), np.array(freqs, dtype=np.float32))
+            for term, (ids, freqs) in postings.items()
+        }
+        self._compute_idf()
+
+    def add_documents(self, corpus):
+        """
+            Appends tokenized documents (ids continue after the existing ones) and recomputes idf.
+
+            Only the postings of the new documents' terms are rebuilt, and every attribute is
+            replaced rather than modified in place, so a copy.copy() of the index can be
+            updated while the original keeps serving queries.
+        """
+        postings = dict(self.postings)
+        added = defaultdict(lambda: ([], []))
+        for doc_id, doc in enumerate(corpus, self.corpus_size):
+            for term, freq in Counter(doc).items():
+                added[term][0].append(doc_id)
+                added[term][1].append(freq)
+        for term, (ids, freqs) in added.items():
+            old_ids, old_freqs = postings.get(term, (np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)))
+            postings[term] = (
+                np.concatenate([old_ids, np.array(ids, dtype=np.int32)]),
+                np.concatenate([old_freqs, np.array(freqs, dtype=np.float32)]),
+            )
+        self.postings = postings
+        self.doc_len = np.concatenate([self.doc_len, np.array([len(doc) for doc in corpus], dtype=np.float32)])
+        self.corpus_size = len(self.doc_len)
+        self.avgdl = float(self.doc_len.mean()) if self.corpus_size else 0.0
+        self._compute_idf()
+
+    def _compute_idf(self):
+        # Same idf as BM25Okapi: negative values are floored at epsilon * average idf
+        idf = {
+            term: math.log(self.corpus_size - len(ids) + 0.5) - math.log(len(ids) + 0.5)
+            for term, (ids, _) in self.postings.items()
+        }
+        average_idf = sum(idf.values()) / len(idf) if idf else 0.0
+        floor = self.epsilon * average_idf
+        self.idf = {term: value if value >= 0 else floor for term, value in idf.items()}
+
+    def _term_scores(self, term):
+        ids, freqs = self.postings[term]
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len[ids] / self.avgdl)
+        return ids, self.idf[term] * freqs * (self.k1 + 1) / (freqs + norm)
+
+    def top_k(self, query, k=1):
+        """Returns [(doc_id, score)] for the k best documents containing at least one query term."""
+        ids, scores = [], []
+        for term, count in Counter(query).items():
+            if term in self.postings:
+                term_ids, term_scores = self._term_scores(term)
+                ids.append(term_ids)
+                scores.append(term_scores * count)  # Repeated query terms count repeatedly, as in BM25Okapi
+        if not ids:
+            return []
+
+        doc_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        totals = np.bincount(inverse, weights=np.concatenate(scores))
+        if len(totals) > k:
+            best = np.argpartition(-totals, k - 1)[:k]
+        else:
+            best = np.arange(len(totals))
+        best = best[np.argsort(-totals[best], kind="stable")]
+        return [(int(doc_ids[i]), float(totals[i])) for i in best]
+
+    def top_k_batch(self, queries, k=1):
+        return [self.top_k(query, k) for query in queries]
@@ -0,0 +1,98 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from telemetry import registry
+
+DEFAULT_TTL = float(os.environ.get("CHATBOT_CATALOG_TTL", "600"))
+DEFAULT_MAXSIZE = int(os.environ.get("CHATBOT_CATALOG_CACHE_SIZE", "4096"))
+
+class TTLCache:
+
+    """
+        Thread-safe LRU cache whose entries expire after a time-to-live.
+
+        Args:
+            maxsize (int): Maximum number of entries kept; the least recently used entry is evicted first.
+            ttl (float): Seconds an entry stays valid after it was stored.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]  # Expired
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+# Registry of every cache created through @cached, so they can be invalidated together
+caches = {}
+
+def cached(name, ttl=DEFAULT_TTL, maxsize=DEFAULT_MAXSIZE):
+    """Read-through cache decorator keyed on the call arguments. Cached values are shared; treat them as read-only."""
+    cache = caches.setdefault(name, TTLCache(maxsize, ttl))
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args):
+            found, value = cache.get(args)
+            if found:
+                return value
+            value = fn(*args)
+            cache.set(args, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+def invalidate(name=None):
+    """Drops cached reference data: one cache by name, or every cache when name is None."""
+    for cache_name, cache in caches.items():
+        if name is None or cache_name == name:
+            cache.invalidate()
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
+
+def _cache_gauges():
+    gauges = {}
+    for name, stats in cache_stats().items():
+        for stat, value in stats.items():
+            gauges[(f"chatbot_catalog_cache_{stat}", (("cache", name),))] = value
+    return gauges
+
+registry.add_gauge_source(_cache_gauges)
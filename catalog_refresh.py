@@ -0,0 +1,217 @@
+import copy
+import logging
+import os
+import threading
+import time
+import numpy as np
+from app_context import context, load_components
+import catalog_cache
+from db import fetch_all, fetch_one
+from entity_fetch import ENTITY_TABLES, ENTITY_TYPES, normalize_terms
+from fuzzy_index import clear_fuzzy_indexes
+from telemetry import count
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = float(os.environ.get("CHATBOT_CATALOG_REFRESH_INTERVAL", "0"))  # Seconds between polls; 0 disables
+# Every Nth poll compares full lists, catching renames that leave row counts and max ids unchanged
+FULL_REFRESH_EVERY = int(os.environ.get("CHATBOT_CATALOG_FULL_REFRESH_EVERY", "60"))
+
+# Auto-increment key of each catalog table, used to fetch only rows added since the last poll
+ID_COLUMNS = {
+    "vehicle_make": "id", "vehicle_model": "id", "vehicle_variant": "id", "vehicle_year": "id",
+    "vehicle_fuel_type": "id", "category": "category_id", "sub_category": "sub_category_id",
+}
+
+def _ready(name):
+    return context.components[name].state == "ready"
+
+def _pattern_docs(entity_type, old_list, added, removed):
+    import pattern
+    # Previously tokenized patterns come from the artifact cache; only added phrases are tokenized
+    docs = [doc for doc in pattern.load_patterns(entity_type, old_list) if doc.text not in removed] if old_list else []
+    return docs + pattern.create_patterns(added)
+
+def apply_changes(changes):
+    """
+        Updates every built catalog-derived component for {list name: (added terms, removed terms)}
+        and swaps them in at once.
+
+        New terms are appended to the vocabulary, so BM25 only indexes the new documents and
+        only their embeddings are encoded; removed terms keep their ids with an empty type mask
+        and drop out of retrieval results. Components that were never built are left alone and
+        build from the new lists on first use.
+    """
+    old_lists = {name: context.get(name) for name in changes}
+    new_lists = {}
+    for name, (added, removed) in changes.items():
+        removed = set(removed)
+        new_lists[name] = [term for term in old_lists[name] if term not in removed] + sorted(added)
+    values = dict(new_lists)
+    any_removed = any(removed for _, removed in changes.values())
+
+    if _ready("vocabulary"):
+        # Term ids are stable: added terms are appended and removed ones only lose their type bit
+        vocabulary = context.get("vocabulary").copy()
+        first_new_id = len(vocabulary)
+        for name, (added, removed) in changes.items():
+            for term in removed:
+                vocabulary.remove(term, ENTITY_TYPES[name])
+            for term in sorted(added):
+                vocabulary.add(term, ENTITY_TYPES[name])
+        new_terms = vocabulary.terms[first_new_id:]
+        values["vocabulary"] = vocabulary
+        if _ready("phrase_automaton"):
+            from phrase_automaton import PhraseAutomaton
+            values["phrase_automaton"] = PhraseAutomaton(vocabulary)
+
+        if _ready("documents"):
+            values["documents"] = vocabulary.terms
+            if _ready("bm25") and new_terms:
+                bm25 = copy.copy(context.get("bm25"))
+                bm25.add_documents([term.split() for term in new_terms])
+                values["bm25"] = bm25
+            if _ready("document_embeddings") and new_terms:
+                encoded = np.asarray(context.get("embedding_model").encode(new_terms, convert_to_numpy=True), dtype=np.float32)
+                values["document_embeddings"] = np.vstack([context.get("document_embeddings"), encoded])
+                if _ready("faiss_index"):
+                    import faiss
+                    # Lookups keep the live index until the swap, so new rows go into a copy
+                    faiss_index = faiss.clone_index(context.get("faiss_index"))
+                    faiss_index.add(np.ascontiguousarray(encoded))
+                    values["faiss_index"] = faiss_index
+
+    if _ready("correct_words"):
+        import missplet_model
+        correct_words = [str(word) for name in missplet_model._WORD_LISTS for word in new_lists.get(name, context.get(name))]
+        values["correct_words"] = correct_words
+        if _ready("spelling_model"):
+            if missplet_model.SPELLING_ENGINE == "symspell" and not any_removed:
+                # Adding terms only ever widens the live deletion index, which is safe during lookups
+                spelling_model = context.get("spelling_model")
+                for added, _ in changes.values():
+                    for term in added:
+                        spelling_model.add_term(str(term))
+            else:
+                values["spelling_model"] = missplet_model.build_spelling_model(correct_words, values["vocabulary"])
+
+    if _ready("entity_dict"):
+        import pattern
+        list_types = {name: entity_type for entity_type, name in pattern.ENTITY_LISTS.items()}
+        entity_dict = dict(context.get("entity_dict"))
+        entity_dict.update({list_types[name]: terms for name, terms in new_lists.items()})
+        values["entity_dict"] = entity_dict
+        if _ready("matcher"):
+            pattern_docs = {
+                list_types[name]: _pattern_docs(list_types[name], old_lists[name], added, set(removed))
+                for name, (added, removed) in changes.items()
+            }
+            values["matcher"] = pattern.build_matcher(entity_dict, pattern_docs)
+
+    context.swap(values)
+    # Lookups and fuzzy indexes built from the old catalog
+    catalog_cache.invalidate()
+    clear_fuzzy_indexes()
+    return values
+
+class CatalogRefresher:
+
+    """
+        Polls the catalog tables and applies changes without a restart.
+
+        Each poll reads COUNT(*) and MAX(id) per table. When they move, only rows with a
+        higher id are fetched; if the count moved by anything other than those rows (deletions),
+        or on every full_every-th poll, the whole list is fetched and diffed instead.
+
+        Args:
+            interval (float): Seconds between polls.
+            full_every (int): Poll count between full comparisons (0 disables them).
+            on_change: Called with the changes after they are applied (e.g. to restart worker processes).
+    """
+
+    def __init__(self, interval=REFRESH_INTERVAL, full_every=FULL_REFRESH_EVERY, on_change=None):
+        self.interval = interval
+        self.full_every = full_every
+        self.on_change = on_change
+        self.signatures = {}  # list name -> (row count, max id)
+        self.polls = 0
+        self.last_refresh = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _signature(self, name):
+        db_name, table, _ = ENTITY_TABLES[name]
+        try:
+            return tuple(fetch_one(db_name, f"SELECT COUNT(*), MAX({ID_COLUMNS.get(table, 'id')}) FROM {table}", name=f"signature_{table}"))
+        except Exception:
+            return (fetch_one(db_name, f"SELECT COUNT(*) FROM {table}", name=f"signature_{table}")[0], None)
+
+    def _changes(self, name, old_signature, signature, full):
+        db_name, table, column = ENTITY_TABLES[name]
+        current = set(context.get(name))
+        if not full and old_signature[1] is not None and signature[1] is not None:
+            rows = fetch_all(
+                db_name, f"SELECT {column} FROM {table} WHERE {ID_COLUMNS.get(table, 'id')} > %s",
+                (old_signature[1],), name=f"delta_{table}"
+            )
+            if signature[0] - old_signature[0] == len(rows):  # Inserts only
+                return normalize_terms(rows) - current, set()
+        terms = normalize_terms(fetch_all(db_name, f"SELECT {column} FROM {table}", name=f"fetch_{table}"))
+        return terms - current, current - terms
+
+    def check(self, full=False):
+        """Polls once and applies any changes; returns {list name: (added, removed)}."""
+        with self._lock:
+            self.polls += 1
+            full = full or bool(self.full_every and self.polls % self.full_every == 0)
+            changes = {}
+            for name in ENTITY_TABLES:
+                if not _ready(name):
+                    continue  # Never loaded, so it will be fetched fresh on first use
+                signature = self._signature(name)
+                old_signature = self.signatures.get(name)
+                self.signatures[name] = signature
+                if old_signature is None or (signature == old_signature and not full):
+                    continue
+                added, removed = self._changes(name, old_signature, signature, full)
+                if added or removed:
+                    changes[name] = (added, removed)
+
+            if changes:
+                start = time.perf_counter()
+                apply_changes(changes)
+                self.last_refresh = time.time()
+                count("chatbot_catalog_refreshes_total")
+                logger.info(
+                    "Catalog refreshed in %.2fs: %s", time.perf_counter() - start,
+                    ", ".join(f"{name} +{len(added)}/-{len(removed)}" for name, (added, removed) in changes.items())
+                )
+                if self.on_change is not None:
+                    self.on_change(changes)
+            return changes
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Error refreshing catalog")
+
+    def start(self):
+        load_components()
+        self.check()  # Records the baseline signatures
+        self._thread = threading.Thread(target=self._run, name="catalog-refresh", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def start_refresher(on_change=None):
+    """Starts background polling when CHATBOT_CATALOG_REFRESH_INTERVAL is set; returns the refresher or None."""
+    if REFRESH_INTERVAL <= 0:
+        return None
+    return CatalogRefresher(on_change=on_change).start()
@@ -1,13 +1,20 @@
+import asyncio
+import os
 import chainlit as cl
-import ollama
 import spacy
-from db import cursor_1, cursor_2
 from entity_handling import (
-    get_make_for_model, handle_make_selection, handle_model_selection,
-    fetch_subcategories, check_subcategory_availability, get_category_for_subcategory
+    aget_make_for_model, ahandle_make_selection, ahandle_model_selection,
+    afetch_subcategories, acheck_subcategory_availability, aget_category_for_subcategory,
+    aget_available_subcategories
 )
-from pattern import extract_entities, nlp, matcher
+from app_context import warm_up
+from availability import get_availability_index, start_availability_refresher
+from catalog_refresh import start_refresher
+from telemetry import configure_logging, end_trace, start_metrics_server, start_trace
+from nlu_worker import NLUBusyError, nlu_pool
 from preprocess import process_input_with_spelling_correction
+from session_store import create_session_store
+from llm import OLLAMA_TIMEOUT, astream_enhancement
 # Modified import to handle the session properly
 # from session import should_start_new_session
 
@@ -42,18 +49,32 @@ def should_start_new_session(detected_entities, session_memory):
     
     return False
 
-# Store user sessions
-user_sessions = {}
+configure_logging()
+# Prometheus metrics at http://host:CHATBOT_METRICS_PORT/metrics
+if os.environ.get("CHATBOT_METRICS_PORT"):
+    start_metrics_server(int(os.environ["CHATBOT_METRICS_PORT"]))
+
+# Build models and indexes, and start NLU worker processes (if configured), before the first message arrives
+warm_up()
+nlu_pool.warm_up()
+# Picks up catalog changes in the background (CHATBOT_CATALOG_REFRESH_INTERVAL); only this process
+# polls the database, and NLU worker processes are replaced so they fork from the new catalog
+catalog_refresher = start_refresher(on_change=lambda changes: nlu_pool.restart())
+# Fitment index behind the availability answers, rebuilt periodically (CHATBOT_AVAILABILITY_REFRESH_INTERVAL)
+get_availability_index()
+availability_refresher = start_availability_refresher()
+
+# Store user sessions (bounded, with optional on-disk spill; see session_store.py)
+session_store = create_session_store()
+
+def get_session_id():
+    # Chainlit's session id is stable across reconnects, so persisted sessions can be restored
+    return cl.user_session.get("id")
 
 @cl.on_chat_start
 async def start():
-    # Initialize a new session for the user
-    # Use a unique identifier for the session
-    session_id = cl.user_session.get("session_id", str(id(cl.user_session)))
-    cl.user_session.set("session_id", session_id)
-    
-    # Initialize empty session memory
-    user_sessions[session_id] = {}
+    # Initialize session memory (restored from disk if this session was persisted before a restart)
+    session_store.get(get_session_id())
     
     # Welcome message
     await cl.Message(
@@ -63,14 +84,22 @@ async def start():
 
 @cl.on_message
 async def on_message(message: cl.Message):
-    # Get the session ID
-    session_id = cl.user_session.get("session_id", str(id(cl.user_session)))
-    
+    session_id = get_session_id()
+    # A new message supersedes any enhanced response still being generated for this user
+    generation = cl.user_session.get("generation_task")
+    if generation and not generation.done():
+        generation.cancel()
+    start_trace()
+    try:
+        # Pinned for the turn, then its new size is recorded and it is written through to disk if configured
+        with session_store.turn(session_id):
+            await handle_message(session_id, message)
+    finally:
+        end_trace()
+
+async def handle_message(session_id, message: cl.Message):
     # Get or create session memory for this user
-    if session_id not in user_sessions:
-        user_sessions[session_id] = {}
-    
-    session_memory = user_sessions[session_id]
+    session_memory = session_store.get(session_id)
     user_query = message.content
     
     # Handle exit or new session commands
@@ -78,17 +107,20 @@ async def on_message(message: cl.Message):
         await cl.Message(content="Goodbye! 😊", author="Car Parts Assistant").send()
         return
     elif user_query.lower() == "new":
-        user_sessions[session_id] = {}
+        session_store.reset(session_id)
         await cl.Message(content="Starting a new session...", author="Car Parts Assistant").send()
         return
     
-    # Extract entities from the query
-    detected_entities = extract_entities(user_query)
+    # Extract entities from the query on the NLU worker pool
+    try:
+        detected_entities = await nlu_pool.extract_entities(user_query)
+    except NLUBusyError:
+        await cl.Message(content="We're handling a lot of requests right now. Please try again in a moment.", author="Car Parts Assistant").send()
+        return
     
     # Check if we should start a new session
     if should_start_new_session(detected_entities, session_memory):
-        user_sessions[session_id] = {}
-        session_memory = user_sessions[session_id]
+        session_memory = session_store.reset(session_id)
     
     # Update session with newly detected entities
     session_memory.update(detected_entities)
@@ -103,7 +135,7 @@ async def on_message(message: cl.Message):
     make_found_through_model = False
     
     if model and not make:
-        detected_make = get_make_for_model(model)
+        detected_make = await aget_make_for_model(model)
         if detected_make:
             session_memory["MAKE"] = detected_make
             make = detected_make
@@ -115,7 +147,7 @@ async def on_message(message: cl.Message):
     
     # Handle make selection (only if make is present and not already found via model)
     if make and not make_found_through_model:
-        make_valid = handle_make_selection(make, session_memory)
+        make_valid = await ahandle_make_selection(make, session_memory)
         if not make_valid:
             await cl.Message(
                 content=f"Sorry, I couldn't find {make} in our database. Please try another make.",
@@ -141,7 +173,7 @@ async def on_message(message: cl.Message):
     # Handle model selection if make is present but model is not
     make = session_memory.get("MAKE")
     if make and not model:
-        model_valid = handle_model_selection(make, model, session_memory)
+        model_valid = await ahandle_model_selection(make, model, session_memory)
         if not model_valid:
             await cl.Message(
                 content=f"Please specify a valid model for {make}.",
@@ -160,7 +192,7 @@ async def on_message(message: cl.Message):
     if sub_category:
         if "AVAILABLE_SUBCATEGORIES" in session_memory and any(sc.lower() == sub_category.lower() for sc in session_memory["AVAILABLE_SUBCATEGORIES"]):
             # Check actual availability for the make/model
-            is_available = check_subcategory_availability(make, model, sub_category)
+            is_available = await acheck_subcategory_availability(make, model, sub_category)
             
             if is_available:
                 response_text = f"Yes, '{sub_category}' is available for {make} {model}."
@@ -170,19 +202,21 @@ async def on_message(message: cl.Message):
             # This is a new subcategory not from the list
             # Get the category if not already present
             if not category:
-                found_category = get_category_for_subcategory(sub_category)
+                found_category = await aget_category_for_subcategory(sub_category)
                 if found_category:
                     category = found_category
                     session_memory["CATEGORY"] = category
             
-            is_available = check_subcategory_availability(make, model, sub_category)
+            is_available = await acheck_subcategory_availability(make, model, sub_category)
             if is_available:
                 response_text = f"Yes, '{sub_category}' is available for {make} {model}."
             else:
                 response_text = f"Sorry, '{sub_category}' is not currently available for {make} {model}."
     elif category:
-        # Fetch subcategories for this category
-        subcategories = fetch_subcategories(category)
+        # Only the subcategories that fit the vehicle; all of the category's without fitment data
+        subcategories = await aget_available_subcategories(make, model, category) if make and model else None
+        if subcategories is None:
+            subcategories = await afetch_subcategories(category)
         
         session_memory["AVAILABLE_SUBCATEGORIES"] = subcategories
         if subcategories:
@@ -205,22 +239,27 @@ async def on_message(message: cl.Message):
         use_ollama = True
     
     if use_ollama:
-        # Show typing indicator
-        async with cl.Step(name="Generating enhanced response..."):
-            # Generate response using Ollama
-            try:
-                response = ollama.chat(
-                    model="gemma:2b",
-                    messages=[{"role": "user", "content": f"User asked: {user_query}\nDatabase says: {response_text}\nProvide a clear response."}],
-                    options={"max_tokens": 200}
-                )
-                ollama_response = response["message"]["content"]
-                await cl.Message(content=ollama_response, author="Car Parts Assistant").send()
-            except Exception as e:
-                await cl.Message(
-                    content=f"I encountered an issue generating an enhanced response. Please rely on the information provided above.",
-                    author="Car Parts Assistant"
-                ).send()
+        # Stream the Ollama response into the chat as tokens arrive
+        msg = cl.Message(content="", author="Car Parts Assistant")
+        generation = asyncio.create_task(stream_enhanced_response(msg, user_query, response_text))
+        cl.user_session.set("generation_task", generation)
+        await asyncio.wait({generation})
+        # Keep whatever was streamed before a cancellation (newer message), timeout or error
+        if msg.content and (generation.cancelled() or generation.exception()):
+            await msg.update()
+        if not generation.cancelled() and generation.exception():
+            await cl.Message(
+                content=f"I encountered an issue generating an enhanced response. Please rely on the information provided above.",
+                author="Car Parts Assistant"
+            ).send()
+
+async def stream_enhanced_response(msg, user_query, response_text):
+    async def stream():
+        async for token in astream_enhancement(user_query, response_text):
+            await msg.stream_token(token)
+        await msg.send()
+
+    await asyncio.wait_for(stream(), OLLAMA_TIMEOUT)
 
 if __name__ == "__main__":
     # This part will not be executed when run through the chainlit run command
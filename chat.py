@@ -1,19 +1,24 @@
-from gru_mem import GRUSessionMemory
-from entity_handling import handle_make_selection, fetch_subcategories, handle_model_selection, get_make_for_model, normalize_make_name, check_subcategory_availability, get_category_for_subcategory
-from entity_fetch import makers_list, models_list, variants_list, years_list, fuel_type_list, category_list, sub_category_list
+from app_context import warm_up
+from telemetry import configure_logging
+from memory_backends import create_session_memory
+from entity_handling import handle_make_selection, fetch_subcategories, handle_model_selection, get_make_for_model, normalize_make_name, check_subcategory_availability, get_category_for_subcategory, get_available_subcategories
 from pattern import extract_entities
 from session import should_start_new_session
 from preprocess import process_input_with_spelling_correction
-from nlp_setup import embedding_model
-import ollama
-from pattern import entity_dict
+from llm import stream_enhancement
+from pattern import ENTITY_LISTS
 
 def chatbot():
+    configure_logging()
+    print("Loading models...")
+    failed = [name for name, status in warm_up().items() if status["state"] != "ready" and not status["optional"]]
+    if failed:
+        print(f"Could not initialize: {', '.join(failed)}")
+        return
     print("Welcome to the Car Parts Chatbot! Type 'exit' to stop or 'new' to start a new session.")
     
-    entity_types = list(entity_dict.keys()) + ["AVAILABLE_SUBCATEGORIES"]
-    session_memory = GRUSessionMemory(len(entity_types), 128, entity_types)
-    session_memory.set_embedding_model(embedding_model)
+    entity_types = list(ENTITY_LISTS.keys()) + ["AVAILABLE_SUBCATEGORIES"]
+    session_memory = create_session_memory(entity_types)  # CHATBOT_MEMORY_BACKEND=slot|gru|gru_pool
     
     while True:
         user_query = input("\nYou: ")
@@ -26,12 +31,13 @@ def chatbot():
                 break
             continue
         
-        detected_entities = extract_entities(user_query)
+        # Per-type match confidences (automaton extractor only) keep a fuzzy match from replacing a recent exact one
+        detected_entities, confidences = extract_entities(user_query, with_confidence=True)
         
         if should_start_new_session(detected_entities, session_memory):
             session_memory.clear()
         
-        session_memory.update_memory(detected_entities)
+        session_memory.update_memory(detected_entities, confidences)
         all_entities = session_memory.get_all_entities()
         
         make = all_entities.get("MAKE")
@@ -86,7 +92,10 @@ def chatbot():
                 is_available = check_subcategory_availability(make, model, sub_category)
                 response_text = f"{'Yes' if is_available else 'Sorry'}, '{sub_category}' is {'available' if is_available else 'not available'} for {make} {model}."
         elif category:
-            subcategories = fetch_subcategories(category)
+            # Only the subcategories that fit the vehicle; all of the category's without fitment data
+            subcategories = get_available_subcategories(make, model, category) if make and model else None
+            if subcategories is None:
+                subcategories = fetch_subcategories(category)
             session_memory.update_memory({"AVAILABLE_SUBCATEGORIES": subcategories})
             response_text = f"Subcategories under {category}{' for ' + make + ' ' + model if make and model else ''}:\n- " + "\n- ".join(subcategories) if subcategories else f"No subcategories found for {category}{' for ' + make + ' ' + model if make and model else ''}"
         
@@ -94,15 +103,9 @@ def chatbot():
         
         if sub_category and all_entities.get("AVAILABLE_SUBCATEGORIES", []):
             print("\nBot: Generating response with Ollama...")
-            stream = ollama.chat(
-                model="gemma:2b",
-                messages=[{"role": "user", "content": f"User asked: {user_query}\nDatabase says: {response_text}\nProvide a clear response."}],
-                options={"max_tokens": 200},
-                stream=True,
-            )
             print("\nBot: ", end="", flush=True)
-            for chunk in stream:
-                print(chunk["message"]["content"], end="", flush=True)
+            for token in stream_enhancement(user_query, response_text):
+                print(token, end="", flush=True)
             print()
 
 if __name__ == "__main__":
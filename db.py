@@ -1,19 +1,111 @@
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import mysql.connector
+from mysql.connector import pooling
+from app_context import context
+from telemetry import timed
 
-def connect_db(db_name):
+CAR_DETAIL_DB = "car_detail_db"
+CAR_PART_DB = "car_part_spares_db"
+
+DB_CONFIG = {
+    "host": os.environ.get("CHATBOT_DB_HOST", "127.0.0.1"),
+    "user": os.environ.get("CHATBOT_DB_USER", "root"),
+    "password": os.environ.get("CHATBOT_DB_PASSWORD", " ***** "),
+}
+POOL_SIZE = int(os.environ.get("CHATBOT_DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("CHATBOT_DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+
+def connect_db(db_name, pool_size=POOL_SIZE):
     try:
-        conn = mysql.connector.connect(host="127.0.0.1", user="root", password=" ***** ", database=db_name)
-        print(f"Connected to {db_name}")
-        return conn
+        pool = pooling.MySQLConnectionPool(pool_name=db_name, pool_size=pool_size, database=db_name, **DB_CONFIG)
+        print(f"Connected to {db_name} (pool size {pool_size})")
+        return pool
     except mysql.connector.Error as err:
         print(f"Error connecting to {db_name}: {err}")
         return None
 
-# Connect to databases
-db_connection_1 = connect_db("car_detail_db")
-db_connection_2 = connect_db("car_part_spares_db")
-if not (db_connection_1 and db_connection_2):
-    exit()
+# Connect to databases (lazily, on first query or warm-up)
+def _create_pools():
+    db_names = (CAR_DETAIL_DB, CAR_PART_DB)
+    # Each pool opens all its connections up front, so both are opened concurrently
+    with ThreadPoolExecutor(len(db_names)) as executor:
+        pools = dict(zip(db_names, executor.map(connect_db, db_names)))
+    failed = [db_name for db_name, pool in pools.items() if pool is None]
+    if failed:
+        raise ConnectionError(f"Could not connect to {', '.join(failed)}")
+    return pools
+
+context.register("db_pools", _create_pools)
+
+# MySQLConnectionPool.get_connection() fails at once when every connection is checked out,
+# so callers first take one of pool_size slots, waiting up to POOL_TIMEOUT for one to free up.
+# Keyed by pool so a recreated pool (e.g. in a forked worker) starts with all slots free.
+_slots = weakref.WeakKeyDictionary()
+_slots_lock = threading.Lock()
+
+def _pool_slots(pool):
+    with _slots_lock:
+        slots = _slots.get(pool)
+        if slots is None:
+            slots = _slots[pool] = threading.BoundedSemaphore(getattr(pool, "pool_size", POOL_SIZE))
+        return slots
+
+@contextmanager
+def get_cursor(db_name):
+    """Checks a connection out of the pool and yields a cursor owned by this caller only."""
+    pool = context.get("db_pools")[db_name]
+    slots = _pool_slots(pool)
+    if not slots.acquire(timeout=POOL_TIMEOUT):
+        raise mysql.connector.errors.PoolError(f"No {db_name} connection free after {POOL_TIMEOUT:g}s")
+    try:
+        conn = pool.get_connection()
+    except BaseException:
+        slots.release()
+        raise
+    try:
+        # Health check: transparently reconnect connections the server has dropped
+        conn.ping(reconnect=True, attempts=3, delay=1)
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+    finally:
+        conn.close()  # Returns the connection to the pool
+        slots.release()
+
+# `name` labels the query in the SQL latency metrics
+def fetch_all(db_name, query, params=(), name="query"):
+    with timed("sql", db=db_name, query=name), get_cursor(db_name) as cursor:
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+def fetch_one(db_name, query, params=(), name="query"):
+    with timed("sql", db=db_name, query=name), get_cursor(db_name) as cursor:
+        cursor.execute(query, params)
+        row = cursor.fetchone()
+        cursor.fetchall()  # Drain unread rows so the connection goes back clean
+        return row
+
+# Async variants run the blocking driver call on a worker thread, keeping the event loop free.
+async def afetch_all(db_name, query, params=(), name="query"):
+    return await asyncio.to_thread(fetch_all, db_name, query, params, name)
+
+async def afetch_one(db_name, query, params=(), name="query"):
+    return await asyncio.to_thread(fetch_one, db_name, query, params, name)
 
-cursor_1 = db_connection_1.cursor()
-cursor_2 = db_connection_2.cursor()
+def check_health():
+    """Returns {db_name: True/False} after a round trip on one pooled connection per database."""
+    status = {}
+    for db_name in (CAR_DETAIL_DB, CAR_PART_DB):
+        try:
+            status[db_name] = fetch_one(db_name, "SELECT 1", name="health_check") == (1,)
+        except (mysql.connector.Error, ConnectionError) as err:
+            print(f"Health check failed for {db_name}: {err}")
+            status[db_name] = False
+    return status
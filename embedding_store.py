@@ -0,0 +1,65 @@
+import os
+import numpy as np
+from app_context import context
+from catalog_cache import TTLCache
+import nlp_setup  # noqa: F401  (registers the vocabulary, embedding and model components)
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get("CHATBOT_EMBEDDING_CACHE_SIZE", "10000"))
+
+class EmbeddingStore:
+
+    """
+        Embedding lookup that reuses the catalog embeddings instead of running the transformer.
+
+        A catalog term resolves to its row of document_embeddings (rows are vocabulary ids);
+        any other string comes from an LRU cache, and the remaining misses of a call are encoded
+        together in one batch. Terms are looked up lowercased, which matches the uncased
+        sentence-transformer. It has the encode() / get_sentence_embedding_dimension() interface
+        of the sentence-transformer, so it can be passed to set_embedding_model().
+
+        Args:
+            encoder: Model used for misses (default: the shared embedding_model component).
+            cache_size (int): Maximum number of off-catalog strings kept.
+    """
+
+    def __init__(self, encoder=None, cache_size=EMBEDDING_CACHE_SIZE):
+        self.encoder = encoder
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))  # Embeddings never go stale
+        self.catalog_hits = 0
+        self.encoded = 0
+
+    def encode(self, texts, convert_to_numpy=True, **kwargs):
+        if isinstance(texts, str):
+            return self.encode([texts])[0]
+        # Vocabulary and embeddings are read together, so a catalog refresh cannot split them
+        vocabulary, embeddings = context.get_many("vocabulary", "document_embeddings")
+        result = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+        misses = {}  # text -> positions in result
+        for i, text in enumerate(texts):
+            term_id = vocabulary.id_of(str(text).strip().lower())
+            if term_id is not None and term_id < len(embeddings):
+                result[i] = embeddings[term_id]
+                self.catalog_hits += 1
+                continue
+            found, embedding = self.cache.get(text)
+            if found:
+                result[i] = embedding
+            else:
+                misses.setdefault(text, []).append(i)
+
+        if misses:
+            encoder = self.encoder or context.get("embedding_model")
+            encoded = np.asarray(encoder.encode(list(misses), convert_to_numpy=True), dtype=np.float32)
+            self.encoded += len(misses)
+            for (text, positions), embedding in zip(misses.items(), encoded):
+                self.cache.set(text, embedding)
+                result[positions] = embedding
+        return result
+
+    def get_sentence_embedding_dimension(self):
+        return context.get("document_embeddings").shape[1]
+
+    def stats(self):
+        return {"catalog_hits": self.catalog_hits, "encoded": self.encoded, **self.cache.stats()}
+
+embedding_store = EmbeddingStore()
@@ -1,17 +1,43 @@
-from db import cursor_1, cursor_2
+import sys
+from app_context import context
+from db import CAR_DETAIL_DB, CAR_PART_DB, fetch_all
 
-def fetch_entities(cursor, table, column):
+def normalize_terms(rows):
+    # Interned, so every list, index and model referencing a term shares one string object
+    return {sys.intern(str(row[0]).strip().lower()) for row in rows if row[0]}
+
+def fetch_entities(db_name, table, column):
     try:
-        cursor.execute(f"SELECT {column} FROM {table}")
-        return list(set(str(row[0]).strip().lower() for row in cursor.fetchall() if row[0]))
+        rows = fetch_all(db_name, f"SELECT {column} FROM {table}", name=f"fetch_{table}")
+        # Sorted so the lists (and every artifact cached from them) are stable across restarts
+        return sorted(normalize_terms(rows))
     except Exception as e:
         print(f"Error fetching {column} from {table}: {e}")
         return []
 
-makers_list = fetch_entities(cursor_1, "vehicle_make", "make_name")
-models_list = fetch_entities(cursor_1, "vehicle_model", "model_name")
-variants_list = fetch_entities(cursor_1, "vehicle_variant", "variant_name")
-years_list = fetch_entities(cursor_1, "vehicle_year", "release_year")
-fuel_type_list = fetch_entities(cursor_1, "vehicle_fuel_type", "fuel_type_name")
-category_list = fetch_entities(cursor_2, "category", "category_name")
-sub_category_list = fetch_entities(cursor_2, "sub_category", "sub_category_name")
\ No newline at end of file
+# Catalog lists, each fetched on first use: list name -> (database, table, column)
+ENTITY_TABLES = {
+    "makers_list": (CAR_DETAIL_DB, "vehicle_make", "make_name"),
+    "models_list": (CAR_DETAIL_DB, "vehicle_model", "model_name"),
+    "variants_list": (CAR_DETAIL_DB, "vehicle_variant", "variant_name"),
+    "years_list": (CAR_DETAIL_DB, "vehicle_year", "release_year"),
+    "fuel_type_list": (CAR_DETAIL_DB, "vehicle_fuel_type", "fuel_type_name"),
+    "category_list": (CAR_PART_DB, "category", "category_name"),
+    "sub_category_list": (CAR_PART_DB, "sub_category", "sub_category_name"),
+}
+
+# Entity type of each catalog list
+ENTITY_TYPES = {
+    "makers_list": "MAKE", "models_list": "MODEL", "variants_list": "VARIANT",
+    "years_list": "YEAR", "fuel_type_list": "FUEL_TYPE",
+    "category_list": "CATEGORY", "sub_category_list": "SUB_CATEGORY",
+}
+
+for _name, _spec in ENTITY_TABLES.items():
+    context.register(_name, lambda spec=_spec: fetch_entities(*spec), deps=("db_pools",))
+
+# `from entity_fetch import makers_list` still works; the list is fetched on first access
+def __getattr__(name):
+    if name in ENTITY_TABLES:
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
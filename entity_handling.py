@@ -1,21 +1,39 @@
-from db import cursor_1, cursor_2
+import asyncio
+import logging
+from availability import get_availability_index
+from catalog_cache import cached
+from db import CAR_DETAIL_DB, CAR_PART_DB, fetch_all, fetch_one
 from preprocess import find_closest_match, process_input_with_spelling_correction
 
+logger = logging.getLogger(__name__)
+
+@cached("make_exists")
 def check_make_exists(make_name):
-    cursor_1.execute("SELECT id FROM vehicle_make WHERE make_name = %s", (make_name,))
-    return cursor_1.fetchone() is not None
+    return fetch_one(CAR_DETAIL_DB, "SELECT id FROM vehicle_make WHERE make_name = %s", (make_name,), name="make_exists") is not None
 
+@cached("makes")
 def get_available_makes():
-    cursor_1.execute("SELECT make_name FROM vehicle_make")
-    return [row[0] for row in cursor_1.fetchall()]
+    return [row[0] for row in fetch_all(CAR_DETAIL_DB, "SELECT make_name FROM vehicle_make", name="makes")]
 
+@cached("models")
 def get_available_models(make):
     query = "SELECT vm.model_name FROM vehicle_model vm JOIN vehicle_make v ON vm.vehicle_make_id = v.id WHERE v.make_name = %s"
-    cursor_1.execute(query, (make,))
-    result = [row[0] for row in cursor_1.fetchall()]
-    print(f"SQL query for '{make}' returned {len(result)} models: {result}")
+    result = [row[0] for row in fetch_all(CAR_DETAIL_DB, query, (make,), name="models_for_make")]
+    logger.debug("SQL query for %r returned %d models: %s", make, len(result), result)
     return result
 
+# Lowercased name lists are cached too, so find_closest_match reuses one fuzzy index per list
+@cached("make_names")
+def get_make_names():
+    makes = get_available_makes()
+    return makes, [m.lower().strip() for m in makes]
+
+@cached("model_names")
+def get_model_names(make):
+    models = get_available_models(make)
+    return models, [m.lower().strip() for m in models]
+
+@cached("make_for_model")
 def get_make_for_model(model):
     query = """
     SELECT v.make_name 
@@ -23,36 +41,48 @@ def get_make_for_model(model):
     JOIN vehicle_model vm ON v.id = vm.vehicle_make_id 
     WHERE vm.model_name = %s
     """
-    cursor_1.execute(query, (model,))
-    result = cursor_1.fetchone()
+    result = fetch_one(CAR_DETAIL_DB, query, (model,), name="make_for_model")
     return result[0] if result else None
 
+@cached("subcategories")
 def fetch_subcategories(category):
-    cursor_2.execute(
+    rows = fetch_all(
+        CAR_PART_DB,
         "SELECT sc.sub_category_name FROM sub_category sc JOIN category c ON sc.category_id = c.category_id WHERE c.category_name = %s",
-        (category,)
+        (category,), name="subcategories"
     )
-    return [row[0] for row in cursor_2.fetchall()]
+    return [row[0] for row in rows]
 
 def check_subcategory_availability(make, model, subcategory):
-    try:
+    index = get_availability_index()
+    is_available = index.is_available(make, model, subcategory) if index else None
+    if is_available is None:
+        # No fitment data for this vehicle or part: keep answering as before rather than refusing
+        logger.debug("No fitment data for %r %r / %r", make, model, subcategory)
         return True
-    except Exception as e:
-        print(f"Error checking availability: {e}")
-        return False
+    return is_available
+
+def get_available_subcategories(make, model, category=None):
+    """Sub-categories (optionally within a category) that fit the model, or None without fitment data."""
+    index = get_availability_index()
+    return index.available_subcategories(make, model, category) if index else None
+
+@cached("category_for_subcategory")
+def _category_for_subcategory(subcategory):
+    result = fetch_one(CAR_PART_DB, """
+        SELECT c.category_name 
+        FROM category c 
+        JOIN sub_category sc ON c.category_id = sc.category_id 
+        WHERE sc.sub_category_name = %s
+    """, (subcategory,), name="category_for_subcategory")
+    return result[0] if result else None
 
 def get_category_for_subcategory(subcategory):
+    # Errors are caught outside the cache, so a transient DB failure is retried on the next call
     try:
-        cursor_2.execute("""
-            SELECT c.category_name 
-            FROM category c 
-            JOIN sub_category sc ON c.category_id = sc.category_id 
-            WHERE sc.sub_category_name = %s
-        """, (subcategory,))
-        result = cursor_2.fetchone()
-        return result[0] if result else None
-    except Exception as e:
-        print(f"Error getting category for subcategory: {e}")
+        return _category_for_subcategory(subcategory)
+    except Exception:
+        logger.exception("Error getting category for subcategory %r", subcategory)
         return None
 
 def normalize_make_name(make):
@@ -63,13 +93,24 @@ def normalize_make_name(make):
         elif check_make_exists("Suzuki"): return "Suzuki"
     return make
 
+# Non-interactive resolution (batch mode): the closest catalog name, or None instead of prompting
+def resolve_make(make):
+    make = normalize_make_name(make)
+    original_makes, original_makes_lower = get_make_names()
+    match = find_closest_match(make.lower().strip(), original_makes_lower)
+    return original_makes[original_makes_lower.index(match)] if match in original_makes_lower else None
+
+def resolve_model(make, model):
+    available_models, available_models_lower = get_model_names(make)
+    match = find_closest_match(model.lower().strip(), available_models_lower)
+    return available_models[available_models_lower.index(match)] if match in available_models_lower else None
+
 def handle_make_selection(make, session_memory):
     make = normalize_make_name(make)
     session_memory.update({"MAKE": make})
-    print(f"Debug - Normalized make: '{make}'")
+    logger.debug("Normalized make: %r", make)
     
-    original_makes = get_available_makes()
-    original_makes_lower = [m.lower().strip() for m in original_makes]
+    original_makes, original_makes_lower = get_make_names()
 
     def get_valid_make_from_user():
         print("\nBot: The detected make is not valid. Here are the available makes:")
@@ -102,8 +143,7 @@ def handle_make_selection(make, session_memory):
     return False
 
 def handle_model_selection(make, model, session_memory):
-    available_models = get_available_models(make)
-    available_models_lower = [m.lower().strip() for m in available_models]
+    available_models, available_models_lower = get_model_names(make)
 
     def get_model_from_user():
         print(f"\nBot: Please select a valid model for {make}. Available models:")
@@ -132,4 +172,26 @@ def handle_model_selection(make, model, session_memory):
                 return False
 
     session_memory.update({"MODEL": model})
-    return True
\ No newline at end of file
+    return True
+
+# Async variants for the Chainlit handlers: each lookup runs on a worker thread with its own pooled cursor.
+async def aget_make_for_model(model):
+    return await asyncio.to_thread(get_make_for_model, model)
+
+async def afetch_subcategories(category):
+    return await asyncio.to_thread(fetch_subcategories, category)
+
+async def acheck_subcategory_availability(make, model, subcategory):
+    return await asyncio.to_thread(check_subcategory_availability, make, model, subcategory)
+
+async def aget_available_subcategories(make, model, category=None):
+    return await asyncio.to_thread(get_available_subcategories, make, model, category)
+
+async def aget_category_for_subcategory(subcategory):
+    return await asyncio.to_thread(get_category_for_subcategory, subcategory)
+
+async def ahandle_make_selection(make, session_memory):
+    return await asyncio.to_thread(handle_make_selection, make, session_memory)
+
+async def ahandle_model_selection(make, model, session_memory):
+    return await asyncio.to_thread(handle_model_selection, make, model, session_memory)
@@ -0,0 +1,112 @@
+import threading
+from collections import Counter, OrderedDict, defaultdict
+import Levenshtein
+
+def _ngrams(word, n):
+    padded = f" {word} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+class FuzzyIndex:
+
+    """
+        Character n-gram inverted index over a list of words for fast closest-match lookups.
+
+        Only words sharing n-grams with the query are considered; the best max_candidates of
+        them (by shared n-gram count) are rescored with Levenshtein.ratio. A typo in a short
+        word can leave no n-gram in common ("bnw" / "bmw"), so when none of them matches, the
+        words sharing padded bigrams (at least the first or last letter) are rescored instead,
+        and for words of up to 3 characters ("gm" / "mg"), every word of a compatible length.
+
+        Args:
+            words (list): Candidate words, matched as given (callers normalize case).
+            n (int): n-gram size.
+            max_candidates (int): Number of n-gram candidates rescored per lookup.
+    """
+
+    def __init__(self, words, n=3, max_candidates=20):
+        self.words = list(words)
+        self.n = n
+        self.max_candidates = max_candidates
+        self.positions = {}  # word -> first index, for the exact-match fast path
+        self.postings = defaultdict(list)  # n-gram -> word indices
+        self.bigram_postings = defaultdict(list)  # padded bigram -> word indices, for the short-word fallback
+        self.lengths = defaultdict(list)  # length -> word indices, for the last fallback
+        for idx, word in enumerate(self.words):
+            self.positions.setdefault(word, idx)
+            self.lengths[len(word)].append(idx)
+            for gram in _ngrams(word, n):
+                self.postings[gram].append(idx)
+            for gram in _ngrams(word, 2):
+                self.bigram_postings[gram].append(idx)
+
+    def _ranked(self, word, postings, n):
+        counts = Counter()
+        for gram in _ngrams(word, n):
+            counts.update(postings.get(gram, ()))
+        return [idx for idx, _ in counts.most_common(self.max_candidates)]
+
+    def _best(self, word, candidates, cutoff):
+        best, best_score = None, cutoff
+        for idx in candidates:
+            score = Levenshtein.ratio(word, self.words[idx])
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = self.words[idx], score
+        return best
+
+    def closest(self, word, cutoff=0.5):
+        """Returns the most similar word with ratio >= cutoff, or None."""
+        if word in self.positions:
+            return word
+        best = self._best(word, self._ranked(word, self.postings, self.n), cutoff)
+        if best is None:
+            best = self._best(word, self._ranked(word, self.bigram_postings, 2), cutoff)
+        if best is None and len(word) <= 3:
+            # ratio <= 2 * min(len) / (sum of lengths), so only these lengths can reach the cutoff
+            lengths = [n for n in self.lengths if 2 * min(n, len(word)) >= cutoff * (n + len(word))]
+            best = self._best(word, (idx for n in lengths for idx in self.lengths[n]), cutoff)
+        return best
+
+# Indexes are cached per candidate list object; callers should pass the same (cached) list each time.
+MAX_INDEXES = 64
+_indexes = OrderedDict()  # id(word_list) -> (word_list, FuzzyIndex)
+_lock = threading.Lock()
+
+def get_fuzzy_index(word_list):
+    key = id(word_list)
+    with _lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0] is word_list and len(entry[1].words) == len(word_list):
+            _indexes.move_to_end(key)
+            return entry[1]
+
+    index = FuzzyIndex(word_list)
+    with _lock:
+        _indexes[key] = (word_list, index)  # Holding the list keeps its id from being reused
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+def clear_fuzzy_indexes():
+    with _lock:
+        _indexes.clear()
+
+if __name__ == "__main__":
+    # Regression check against the difflib lookup this index replaced: every single-edit typo of a
+    # short catalog name that difflib resolves must resolve here too
+    import difflib
+    names = ["bmw", "kia", "mg", "fiat", "audi", "jeep", "ford", "tata", "mini", "seat", "opel", "lexus", "volvo", "skoda", "honda", "toyota", "nissan"]
+    index = FuzzyIndex(names)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    missed = []
+    for name in names:
+        typos = {name[:i] + c + name[i + 1:] for i in range(len(name)) for c in letters}
+        typos |= {name[:i] + name[i + 1] + name[i] + name[i + 2:] for i in range(len(name) - 1)}
+        typos |= {name[:i] + name[i + 1:] for i in range(len(name))} - {""}
+        for typo in sorted(typos):
+            if difflib.get_close_matches(typo, names, n=1, cutoff=0.5) and index.closest(typo) is None:
+                missed.append(typo)
+    for typo, expected in [("bnw", "bmw"), ("kai", "kia"), ("mq", "mg"), ("fait", "fiat")]:
+        if index.closest(typo) != expected:
+            missed.append(typo)
+    print(f"{len(missed)} typos resolved by difflib but not by FuzzyIndex" + (f": {missed[:20]}" if missed else ""))
+    raise SystemExit(1 if missed else 0)
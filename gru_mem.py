@@ -1,6 +1,53 @@
 import torch
 import torch.nn as nn
 import numpy as np
+from telemetry import timed
+
+class EntityStore:
+
+    """
+        Remembered entities of one session as a single pre-normalized embedding matrix.
+
+        Args:
+            embedding_dim (int): Size of the entity embeddings.
+    """
+
+    def __init__(self, embedding_dim):
+        self.embedding_dim = embedding_dim
+        self.matrix = np.zeros((8, embedding_dim), dtype=np.float32)  # Row buffer, grown by doubling
+        self.type_ids = np.full(8, -1, dtype=np.int64)  # Entity type index of each row
+        self.values = []  # Original entity value of each row
+        self.rows = {}  # (type index, value key) -> row
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, type_idx, value, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)  # Normalize once on insert
+        key = (type_idx, str(value))
+        row = self.rows.get(key)
+        if row is None:  # New entity: append a row
+            row = len(self.values)
+            if row == len(self.matrix):
+                self.matrix = np.concatenate([self.matrix, np.zeros_like(self.matrix)])
+                self.type_ids = np.concatenate([self.type_ids, np.full(len(self.type_ids), -1, dtype=np.int64)])
+            self.values.append(value)
+            self.rows[key] = row
+        self.matrix[row] = embedding
+        self.type_ids[row] = type_idx
+
+    def best_per_type(self, queries, type_indices):
+        """Returns the value closest to each query among rows of the matching type (None if that type is empty)."""
+        n = len(self.values)
+        if n == 0:
+            return [None] * len(type_indices)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ self.matrix[:n].T  # One matrix multiply: (types, rows) cosine similarities
+        mask = self.type_ids[:n][None, :] == np.asarray(type_indices)[:, None]
+        scores = np.where(mask, scores, -np.inf)
+        best = scores.argmax(axis=1)
+        return [self.values[row] if mask[i, row] else None for i, row in enumerate(best)]
 
 class GRUSessionMemory(nn.Module):
 
@@ -17,95 +64,78 @@ class GRUSessionMemory(nn.Module):
         super(GRUSessionMemory, self).__init__()
         self.hidden_size = hidden_size  # Size of the GRU hidden state
         self.entity_types = entity_types  # List of entity types
+        self.type_index = {entity_type: idx for idx, entity_type in enumerate(entity_types)}  # Entity type -> one-hot position
         self.gru = nn.GRU(input_size, hidden_size, batch_first=True)  # GRU layer
         self.fc = nn.Linear(hidden_size, len(entity_types))  # Fully connected layer for entity type prediction
         self.embedding_dim = 384  # Default embedding dimension (e.g., for SentenceTransformer)
         self.embedding_projection = nn.Linear(hidden_size, self.embedding_dim)  # Projects GRU output to embedding space
-        self.entity_embeddings = {}  # Dictionary to store entity embeddings
+        self.entity_store = EntityStore(self.embedding_dim)  # Embedding matrix of remembered entities
         self.current_state = torch.zeros(1, 1, hidden_size)  # Initial hidden state of the GRU
+        self.type_queries = torch.eye(len(entity_types)).unsqueeze(1)  # One one-hot query per entity type, shape (types, 1, types)
 
-    # processes input data through the GRU and a fully connected layer to predict 
+    # processes input data through the GRU and a fully connected layer to predict
     # entity types, returning both the predictions and the updated hidden state
 
     def forward(self, x, hidden):
         out, hidden = self.gru(x, hidden)  # Pass input through GRU
         out = self.fc(out)  # Map GRU output to entity type predictions
         return out, hidden
-    
+
     # Updates the memory (hidden state) based on new entity information.
 
-    def update_memory(self, entities):      
-        input_tensor = self._entities_to_tensor(entities)  # Convert entities to input tensor
-        _, self.current_state = self.gru(input_tensor, self.current_state)  # Update hidden state
+    def update_memory(self, entities, confidence=None):
+        # confidence is accepted for interface compatibility with SlotSessionMemory; the GRU does not use it
+        with timed("memory_update"):
+            input_tensor = self._entities_to_tensor(entities)  # Convert entities to input tensor
+            _, self.current_state = self.gru(input_tensor, self.current_state)  # Update hidden state
 
-    # Retrieves the closest matching entity of a specific type from memory. 
+    # Retrieves the closest matching entity of a specific type from memory.
 
     def get_entity(self, entity_type):
-        query_tensor = torch.zeros(1, 1, len(self.entity_types))  # Create a query tensor
-        entity_idx = self.entity_types.index(entity_type) if entity_type in self.entity_types else -1  # Find entity index
-        
-        if entity_idx >= 0:  # If entity type is valid
-            query_tensor[0, 0, entity_idx] = 1.0  # One-hot encode the entity type
-            with torch.no_grad():  # Disable gradient computation
-                hidden = self.current_state  # Use current hidden state
-                out, _ = self.gru(query_tensor, hidden)  # Pass query through GRU
-                return self._find_closest_entity(out[0, 0].numpy(), entity_type)  # Find closest entity
-        return None  # if invalid
-    
-    # Retrieves all entities stored in memory
+        if entity_type not in self.type_index:  # if invalid
+            return None
+        return self._recall([self.type_index[entity_type]])[0]
+
+    # Retrieves all entities stored in memory with one batched GRU step and one matrix multiply
 
     def get_all_entities(self):
-        result = {}
-        for entity_type in self.entity_types:  # Iterate over all entity types
-            entity_value = self.get_entity(entity_type)  # Retrieve entity value
-            if entity_value:
-                result[entity_type] = entity_value  # Add to result dictionary
-        return result
-    
+        if not len(self.entity_store):  # Nothing remembered yet
+            return {}
+        with timed("memory_recall"):
+            values = self._recall(range(len(self.entity_types)))
+        return {entity_type: value for entity_type, value in zip(self.entity_types, values) if value}
+
+    # Runs the GRU once for a batch of entity type queries and matches the projections against the entity store.
+
+    def _recall(self, type_indices):
+        type_indices = list(type_indices)
+        if not len(self.entity_store):
+            return [None] * len(type_indices)
+        with torch.no_grad():  # Disable gradient computation
+            queries = self.type_queries[type_indices]  # (batch, 1, types)
+            hidden = self.current_state.expand(1, len(type_indices), self.hidden_size).contiguous()  # Same state for every query
+            out, _ = self.gru(queries, hidden)  # Pass all queries through the GRU at once
+            projected = self.embedding_projection(out[:, 0]).numpy()  # Project to embedding space
+        return self.entity_store.best_per_type(projected, type_indices)
+
     # Converts a dictionary of entities into a tensor suitable for input to the GRU.
 
     def _entities_to_tensor(self, entities):
         input_tensor = torch.zeros(1, 1, len(self.entity_types))  # Initialize tensor with zeros
-        for entity_type, entity_value in entities.items():  # Iterate over entities
-            if entity_type in self.entity_types:  # If entity type is valid
-                entity_idx = self.entity_types.index(entity_type)  # Get entity index
-                input_tensor[0, 0, entity_idx] = 1.0  # One-hot encode the entity type
-                if hasattr(self, 'embedding_model'):  # If embedding model is available
-                    self.entity_embeddings[f"{entity_type}_{entity_value}"] = self.embedding_model.encode(entity_value)  # Store embedding
+        known = [(self.type_index[t], v) for t, v in entities.items() if t in self.type_index]  # Valid entity types only
+        for entity_idx, _ in known:
+            input_tensor[0, 0, entity_idx] = 1.0  # One-hot encode the entity type
+        if known and hasattr(self, 'embedding_model'):  # If embedding model is available
+            texts = [", ".join(map(str, v)) if isinstance(v, (list, tuple)) else str(v) for _, v in known]
+            embeddings = self.embedding_model.encode(texts)  # Encode all values in one call
+            for (entity_idx, entity_value), embedding in zip(known, embeddings):
+                self.entity_store.add(entity_idx, entity_value, embedding)  # Store embedding
         return input_tensor
-    
-    # Finds the closest matching entity for a given query vector.
 
-    def _find_closest_entity(self, query_vector, entity_type):
-        matching_keys = [k for k in self.entity_embeddings.keys() if k.startswith(f"{entity_type}_")]  # Filter matching keys
-        if not matching_keys:  # If no matching keys, return None
-            return None
-            
-        query_tensor = torch.tensor(query_vector, dtype=torch.float32).unsqueeze(0)  # Convert query vector to tensor
-        with torch.no_grad():  # Disable gradient computation
-            projected_query = self.embedding_projection(query_tensor).squeeze(0).numpy()  # Project query to embedding space
-        
-        closest_entity = None  # Initialize closest entity
-        best_score = -float('inf')  # Initialize best similarity score
-        
-        for key, embedding in self.entity_embeddings.items():  # Iterate over embeddings
-            if key.startswith(f"{entity_type}_"):  # If key matches entity type
-                try:
-                    # Compute cosine similarity
-                    score = np.dot(projected_query, embedding) / (np.linalg.norm(projected_query) * np.linalg.norm(embedding))
-                    if score > best_score:  # Update best score and closest entity
-                        best_score = score
-                        closest_entity = key.split('_', 1)[1]
-                except ValueError as e:  # Handle dimension mismatch
-                    print(f"Warning: Dimension mismatch in similarity calculation: {e}")
-                    return matching_keys[-1].split('_', 1)[1]  # Return last matching entity
-        
-        return closest_entity  # Return closest entity
-    
     def clear(self):
         self.current_state = torch.zeros(1, 1, self.hidden_size)  # Reset hidden state
-        self.entity_embeddings = {}  # Clear entity embeddings
-        
+        self.entity_store = EntityStore(self.embedding_dim)  # Clear entity embeddings
+
     def set_embedding_model(self, model):
         self.embedding_model = model  # Set embedding model
         if hasattr(model, 'get_sentence_embedding_dimension'):  # If model has embedding dimension
@@ -113,4 +143,5 @@ class GRUSessionMemory(nn.Module):
             if actual_dim != self.embedding_dim:  # If dimension differs from default
                 print(f"Warning: Updating embedding projection from {self.embedding_dim} to {actual_dim}")
                 self.embedding_dim = actual_dim  # Update embedding dimension
-                self.embedding_projection = nn.Linear(self.hidden_size, self.embedding_dim)  # Reinitialize projection layer
\ No newline at end of file
+                self.embedding_projection = nn.Linear(self.hidden_size, self.embedding_dim)  # Reinitialize projection layer
+                self.entity_store = EntityStore(self.embedding_dim)  # Stored rows no longer match the projection
@@ -0,0 +1,118 @@
+import threading
+import torch
+from gru_mem import EntityStore
+from telemetry import timed
+
+class GRUMemoryPool:
+
+    """
+        Session memory for many chat sessions sharing one set of GRU/projection weights.
+
+        Hidden states of all sessions live in one (1, capacity, hidden) tensor, so updates and
+        recalls for many sessions run as a single batched GRU step (update_many / recall_many).
+
+        Args:
+            model (GRUSessionMemory): Provides the shared weights, entity types and embedding model.
+            initial_capacity (int): Number of session slots allocated up front (grown by doubling).
+    """
+
+    def __init__(self, model, initial_capacity=64):
+        self.model = model
+        self.states = torch.zeros(1, initial_capacity, model.hidden_size)  # Hidden state per slot
+        self.slots = {}  # session_id -> slot in self.states
+        self.stores = {}  # session_id -> EntityStore
+        self.free_slots = list(range(initial_capacity - 1, -1, -1))
+        self._lock = threading.RLock()
+
+    def session(self, session_id):
+        """Returns a GRUSessionMemory-compatible view of one session."""
+        return PooledSessionMemory(self, session_id)
+
+    def _slot(self, session_id):
+        slot = self.slots.get(session_id)
+        if slot is None:
+            if not self.free_slots:  # Grow the state tensor
+                capacity = self.states.shape[1]
+                self.states = torch.cat([self.states, torch.zeros_like(self.states)], dim=1)
+                self.free_slots = list(range(2 * capacity - 1, capacity - 1, -1))
+            slot = self.slots[session_id] = self.free_slots.pop()
+            self.stores[session_id] = EntityStore(self.model.embedding_dim)
+        return slot
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self.slots:
+                self.states[:, self.slots[session_id]] = 0
+                self.stores[session_id] = EntityStore(self.model.embedding_dim)
+
+    def release(self, session_id):
+        """Frees the slot of a finished session."""
+        with self._lock:
+            slot = self.slots.pop(session_id, None)
+            if slot is not None:
+                self.states[:, slot] = 0
+                self.stores.pop(session_id, None)
+                self.free_slots.append(slot)
+
+    def update_many(self, updates):
+        """Applies [(session_id, entities)] with one embedding call and one GRU step. Session ids must be unique."""
+        model = self.model
+        with timed("memory_update", batch="pool"), self._lock, torch.no_grad():
+            slots = [self._slot(session_id) for session_id, _ in updates]
+            inputs = torch.zeros(len(updates), 1, len(model.entity_types))
+            to_store = []  # (session_id, type index, value)
+            for i, (session_id, entities) in enumerate(updates):
+                for entity_type, entity_value in entities.items():
+                    if entity_type in model.type_index:
+                        inputs[i, 0, model.type_index[entity_type]] = 1.0
+                        to_store.append((session_id, model.type_index[entity_type], entity_value))
+
+            if to_store and hasattr(model, 'embedding_model'):
+                texts = [", ".join(map(str, v)) if isinstance(v, (list, tuple)) else str(v) for _, _, v in to_store]
+                for (session_id, entity_idx, entity_value), embedding in zip(to_store, model.embedding_model.encode(texts)):
+                    self.stores[session_id].add(entity_idx, entity_value, embedding)
+
+            index = torch.tensor(slots)
+            _, new_states = model.gru(inputs, self.states[:, index].contiguous())
+            self.states[:, index] = new_states
+
+    def recall_many(self, session_ids):
+        """Returns get_all_entities() for each session, from one GRU step over every (session, type) pair."""
+        model = self.model
+        num_types = len(model.entity_types)
+        with timed("memory_recall", batch="pool"), self._lock:
+            active = [s for s in dict.fromkeys(session_ids) if s in self.stores and len(self.stores[s])]
+            results = {}
+            if active:
+                with torch.no_grad():
+                    index = torch.tensor([self.slots[s] for s in active]).repeat_interleave(num_types)
+                    queries = model.type_queries.repeat(len(active), 1, 1)  # (sessions * types, 1, types)
+                    out, _ = model.gru(queries, self.states[:, index].contiguous())
+                    projected = model.embedding_projection(out[:, 0]).numpy().reshape(len(active), num_types, -1)
+                type_indices = list(range(num_types))
+                for session_id, session_queries in zip(active, projected):
+                    values = self.stores[session_id].best_per_type(session_queries, type_indices)
+                    results[session_id] = {t: v for t, v in zip(model.entity_types, values) if v}
+        return [results.get(session_id, {}) for session_id in session_ids]
+
+class PooledSessionMemory:
+
+    """
+        View of one session inside a GRUMemoryPool with the GRUSessionMemory interface.
+    """
+
+    def __init__(self, pool, session_id):
+        self.pool = pool
+        self.session_id = session_id
+
+    def update_memory(self, entities, confidence=None):
+        self.pool.update_many([(self.session_id, entities)])
+
+    def get_all_entities(self):
+        return self.pool.recall_many([self.session_id])[0]
+
+    def get_entity(self, entity_type):
+        return self.get_all_entities().get(entity_type)
+
+    def clear(self):
+        self.pool.clear(self.session_id)
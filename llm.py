@@ -0,0 +1,71 @@
+import asyncio
+import os
+import time
+import ollama
+from response_cache import SemanticResponseCache
+from retrieval import embed_query
+from telemetry import count, registry, timed
+
+OLLAMA_MODEL = os.environ.get("CHATBOT_OLLAMA_MODEL", "gemma:2b")
+OLLAMA_OPTIONS = {"max_tokens": 200}
+OLLAMA_TIMEOUT = float(os.environ.get("CHATBOT_OLLAMA_TIMEOUT", "60"))  # Seconds for a whole generation
+
+# Enhanced answers are reused for semantically equivalent questions with the same database answer
+response_cache = SemanticResponseCache(
+    embed_query,
+    threshold=float(os.environ.get("CHATBOT_RESPONSE_CACHE_THRESHOLD", "0.9")),
+    maxsize=int(os.environ.get("CHATBOT_RESPONSE_CACHE_SIZE", "2048")),
+    ttl=float(os.environ.get("CHATBOT_RESPONSE_CACHE_TTL", "3600")),
+)
+
+def build_messages(user_query, response_text):
+    return [{"role": "user", "content": f"User asked: {user_query}\nDatabase says: {response_text}\nProvide a clear response."}]
+
+# Yields the enhanced response token by token (blocking client, for the CLI)
+def stream_enhancement(user_query, response_text):
+    cached = response_cache.lookup(user_query, response_text)
+    count("chatbot_llm_requests_total", cached=str(cached is not None).lower())
+    if cached is not None:
+        yield cached
+        return
+
+    with timed("ollama"):
+        start = time.perf_counter()
+        stream = ollama.chat(
+            model=OLLAMA_MODEL,
+            messages=build_messages(user_query, response_text),
+            options=OLLAMA_OPTIONS,
+            stream=True,
+        )
+        tokens = []
+        for chunk in stream:
+            if not tokens:
+                registry.observe("chatbot_llm_first_token_seconds", time.perf_counter() - start)
+            tokens.append(chunk["message"]["content"])
+            yield tokens[-1]
+    response_cache.store(user_query, response_text, "".join(tokens))
+
+# Async variant for the Chainlit bot: never blocks the event loop
+async def astream_enhancement(user_query, response_text):
+    cached = await asyncio.to_thread(response_cache.lookup, user_query, response_text)
+    count("chatbot_llm_requests_total", cached=str(cached is not None).lower())
+    if cached is not None:
+        yield cached
+        return
+
+    with timed("ollama"):
+        start = time.perf_counter()
+        stream = await ollama.AsyncClient().chat(
+            model=OLLAMA_MODEL,
+            messages=build_messages(user_query, response_text),
+            options=OLLAMA_OPTIONS,
+            stream=True,
+        )
+        tokens = []
+        async for chunk in stream:
+            if not tokens:
+                registry.observe("chatbot_llm_first_token_seconds", time.perf_counter() - start)
+            tokens.append(chunk["message"]["content"])
+            yield tokens[-1]
+    # Only complete generations are cached; cancelled or timed-out streams never get here
+    await asyncio.to_thread(response_cache.store, user_query, response_text, "".join(tokens))
@@ -0,0 +1,94 @@
+import itertools
+import os
+import threading
+import weakref
+
+# "slot" (plain per-type slots), "gru" (one GRUSessionMemory per session) or "gru_pool"
+# (sessions of one shared GRUMemoryPool)
+MEMORY_BACKEND = os.environ.get("CHATBOT_MEMORY_BACKEND", "slot")
+# Turns during which a slot keeps a higher-confidence value over a lower-confidence one
+SLOT_RECENT_TURNS = int(os.environ.get("CHATBOT_SLOT_RECENT_TURNS", "2"))
+
+class SlotSessionMemory:
+
+    """
+        Deterministic session memory with the GRUSessionMemory interface.
+
+        Each entity type has one slot holding a value with the turn it was set in and the
+        extractor's confidence, so recall is a dict lookup with no model calls. A value replaces
+        the slot unless the slot holds a different value set within the last recent_turns turns
+        with a higher confidence (e.g. a fuzzy match right after an exact one).
+
+        Args:
+            entity_types (list): Entity types that can be remembered.
+            recent_turns (int): Turns during which a higher-confidence value is kept.
+    """
+
+    def __init__(self, entity_types, recent_turns=SLOT_RECENT_TURNS):
+        self.entity_types = entity_types
+        self.type_set = set(entity_types)
+        self.recent_turns = recent_turns
+        self.slots = {}  # entity type -> (value, turn, confidence)
+        self.turn = 0
+
+    def update_memory(self, entities, confidence=None):
+        """Stores a turn's entities; confidence is {entity type: 0-1} from the extractor (missing types count as 1.0)."""
+        self.turn += 1
+        for entity_type, entity_value in entities.items():
+            if entity_type not in self.type_set:
+                continue
+            confidence_of_type = confidence.get(entity_type, 1.0) if confidence else 1.0
+            slot = self.slots.get(entity_type)
+            if slot and slot[0] != entity_value and slot[2] > confidence_of_type and self.turn - slot[1] <= self.recent_turns:
+                continue
+            self.slots[entity_type] = (entity_value, self.turn, confidence_of_type)
+
+    def get_entity(self, entity_type):
+        slot = self.slots.get(entity_type)
+        return slot[0] if slot else None
+
+    def get_all_entities(self):
+        return {entity_type: slot[0] for entity_type, slot in self.slots.items()}
+
+    def clear(self):
+        self.slots = {}
+        self.turn = 0
+
+    def set_embedding_model(self, model):
+        pass  # Slots need no embeddings; kept for interface compatibility
+
+_pools = {}  # entity types -> GRUMemoryPool shared by every "gru_pool" session
+_pools_lock = threading.Lock()
+_session_ids = itertools.count()
+
+def _gru_memory(entity_types, embedding_model):
+    from gru_mem import GRUSessionMemory
+    memory = GRUSessionMemory(len(entity_types), 128, entity_types)
+    if embedding_model is None:
+        # Catalog terms reuse their precomputed embeddings; only other strings are encoded
+        from embedding_store import embedding_store as embedding_model
+    memory.set_embedding_model(embedding_model)
+    return memory
+
+def create_session_memory(entity_types, embedding_model=None, backend=None):
+    """
+        Builds the session memory selected by backend (default CHATBOT_MEMORY_BACKEND).
+
+        "gru_pool" sessions share one GRUMemoryPool per set of entity types (its weights and
+        embedding model come from the first call); a session's slot is freed when it is garbage collected.
+    """
+    backend = backend or MEMORY_BACKEND
+    if backend == "slot":
+        return SlotSessionMemory(entity_types)
+    if backend == "gru":
+        return _gru_memory(entity_types, embedding_model)
+    if backend == "gru_pool":
+        from gru_pool import GRUMemoryPool
+        with _pools_lock:
+            pool = _pools.get(tuple(entity_types))
+            if pool is None:
+                pool = _pools[tuple(entity_types)] = GRUMemoryPool(_gru_memory(entity_types, embedding_model))
+        memory = pool.session(next(_session_ids))
+        weakref.finalize(memory, pool.release, memory.session_id)
+        return memory
+    raise ValueError(f"Unknown session memory backend: {backend!r}")
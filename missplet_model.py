@@ -1,7 +1,10 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import KNeighborsClassifier
+import os
 import numpy as np
-from entity_fetch import makers_list, models_list, variants_list, years_list, fuel_type_list, category_list, sub_category_list
+from app_context import context
+import entity_fetch
+import vocabulary as _vocabulary  # noqa: F401  (registers the vocabulary component)
+from artifact_cache import cached_object, content_hash
+from symspell import build_symspell
 
 def generate_misspellings(word):
     misspellings = set()
@@ -23,32 +26,81 @@ def generate_misspellings(word):
     return list(misspellings)
 
 # Step 2: Prepare Training Data
-correct_words = (
-    makers_list + models_list + variants_list + 
-    [str(year) for year in years_list] +  
-    fuel_type_list + category_list + sub_category_list
-)
+_WORD_LISTS = tuple(entity_fetch.ENTITY_TYPES)
 
-misspelled_pairs = []
+def _build_correct_words():
+    return [str(word) for name in _WORD_LISTS for word in context.get(name)]
 
-for word in correct_words:
-    misspelled = generate_misspellings(word)
-    for wrong in misspelled:
-        misspelled_pairs.append((wrong, word))
+def generate_misspelled_pairs(words):
+    misspelled_pairs = []
+    for word in words:
+        misspelled = generate_misspellings(word)
+        for wrong in misspelled:
+            misspelled_pairs.append((wrong, word))
+    return misspelled_pairs
 
 # Step 3: Train the Model
-X_train, y_train = zip(*misspelled_pairs)
-vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(2, 3))
-X_train_tfidf = vectorizer.fit_transform(X_train)
+# Labels are vocabulary term ids rather than strings; predictions map back through vocabulary.terms
+def train_model(words, vocabulary):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.neighbors import KNeighborsClassifier
 
-knn = KNeighborsClassifier(n_neighbors=3, metric='cosine')
-knn.fit(X_train_tfidf, y_train)
+    X_train, y_train = zip(*generate_misspelled_pairs(dict.fromkeys(words)))  # Each term once
+    vectorizer = TfidfVectorizer(analyzer='char', ngram_range=(2, 3))
+    X_train_tfidf = vectorizer.fit_transform(X_train)
+
+    knn = KNeighborsClassifier(n_neighbors=3, metric='cosine')
+    knn.fit(X_train_tfidf, np.array([vocabulary.id_of(word) for word in y_train], dtype=np.int32))
+    return vectorizer, knn
+
+# "knn" (TF-IDF + nearest neighbours over generated misspellings) or "symspell" (deletion index)
+SPELLING_ENGINE = os.environ.get("CHATBOT_SPELLING_ENGINE", "knn")
+
+# Bump MODEL_VERSION whenever generate_misspellings or the model settings change.
+MODEL_VERSION = 2
+
+# The spelling model is trained (or loaded from the artifact cache) on first use
+def build_spelling_model(correct_words, vocabulary):
+    if SPELLING_ENGINE == "symspell":
+        return cached_object("symspell", content_hash(MODEL_VERSION, correct_words), lambda: build_symspell(correct_words))
+    # Term ids depend on vocabulary order, so it is part of the key
+    key = content_hash(MODEL_VERSION, correct_words, vocabulary.terms)
+    return cached_object("spelling", key, lambda: train_model(correct_words, vocabulary))
+
+def _build_spelling_model():
+    return build_spelling_model(context.get("correct_words"), context.get("vocabulary"))
+
+context.register("correct_words", _build_correct_words, deps=_WORD_LISTS)
+context.register("spelling_model", _build_spelling_model, deps=("correct_words", "vocabulary"))
+
+def __getattr__(name):
+    if name in ("correct_words", "spelling_model"):
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _predict(words):
+    model = context.get("spelling_model")
+    if SPELLING_ENGINE == "symspell":
+        # Words with no dictionary term within edit range are left as typed
+        return [suggestion or word.lower() for word, suggestion in zip(words, model.lookup_batch([w.lower() for w in words]))]
+    vectorizer, knn = model
+    terms = context.get("vocabulary").terms
+    return [terms[term_id] for term_id in knn.predict(vectorizer.transform(words))]
+
+# Corrects a whole batch of words with a single model call (one TF-IDF transform + neighbor search for knn)
+def correct_spelling_batch(words):
+    # Exact catalog terms skip the model entirely
+    vocabulary = context.get("vocabulary")
+    corrected = [word.lower() if word.lower() in vocabulary else None for word in words]
+    misses = list(dict.fromkeys(word for word, fixed in zip(words, corrected) if fixed is None))
+    if misses:
+        predictions = dict(zip(misses, _predict(misses)))
+        corrected = [fixed if fixed is not None else predictions[word] for word, fixed in zip(words, corrected)]
+    return corrected
 
 # Function to correct spelling
 def correct_spelling(word):
-    word_tfidf = vectorizer.transform([word])
-    prediction = knn.predict(word_tfidf)[0]
-    return prediction
+    return correct_spelling_batch([word])[0]
 
 # **Export model components for other files**
-__all__ = ["correct_spelling"]  # Exports only this function
\ No newline at end of file
+__all__ = ["correct_spelling", "correct_spelling_batch"]
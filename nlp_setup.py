@@ -1,16 +1,56 @@
-import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from rank_bm25 import BM25Okapi
-from entity_fetch import makers_list, models_list, variants_list, years_list, fuel_type_list, category_list, sub_category_list
+from app_context import context
+import vocabulary as _vocabulary  # noqa: F401  (registers the vocabulary and catalog list components)
+from artifact_cache import cached_array, cached_object, content_hash
+from bm25_index import SparseBM25
 
-# NLP setup
-documents = makers_list + models_list + variants_list + years_list + fuel_type_list + category_list + sub_category_list
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-document_embeddings = np.array(embedding_model.encode(documents, convert_to_numpy=True))
-embedding_dim = document_embeddings.shape[1]
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+BM25_VERSION = "sparse-1"  # Bump when SparseBM25 changes layout
 
-faiss_index = faiss.IndexFlatL2(embedding_dim)
-faiss_index.add(document_embeddings)
+# NLP setup: every object below is built on first use (or by app_context.warm_up())
+# One document per vocabulary term, so BM25 document ids and FAISS rows are term ids;
+# vocabulary.types_of(doc_id) gives the entity types of a document.
+def _build_documents():
+    return context.get("vocabulary").terms
 
-bm25 = BM25Okapi([doc.split() for doc in documents])
\ No newline at end of file
+def _load_embedding_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def _build_document_embeddings():
+    documents = context.get("documents")
+    # The transformer is only loaded here on a cache miss
+    return cached_array(
+        "embeddings", content_hash(EMBEDDING_MODEL_NAME, documents),
+        lambda: np.array(context.get("embedding_model").encode(documents, convert_to_numpy=True), dtype=np.float32)
+    )
+
+def build_faiss_index(document_embeddings):
+    import faiss
+    # A flat index is just a copy of the (cached) embedding matrix, so rebuilding it is cheap.
+    faiss_index = faiss.IndexFlatL2(document_embeddings.shape[1])
+    faiss_index.add(np.ascontiguousarray(document_embeddings))
+    return faiss_index
+
+def _build_faiss_index():
+    return build_faiss_index(context.get("document_embeddings"))
+
+def build_bm25(documents):
+    return cached_object("bm25", content_hash(BM25_VERSION, documents), lambda: SparseBM25([doc.split() for doc in documents]))
+
+def _build_bm25():
+    return build_bm25(context.get("documents"))
+
+context.register("documents", _build_documents, deps=("vocabulary",))
+context.register("embedding_model", _load_embedding_model)
+context.register("document_embeddings", _build_document_embeddings, deps=("documents",))
+context.register("faiss_index", _build_faiss_index, deps=("document_embeddings",))
+context.register("bm25", _build_bm25, deps=("documents",))
+
+# Module attributes (documents, bm25, embedding_model, ...) resolve to the lazily built components
+def __getattr__(name):
+    if name == "embedding_dim":
+        return context.get("document_embeddings").shape[1]
+    if name in ("documents", "embedding_model", "document_embeddings", "faiss_index", "bm25"):
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
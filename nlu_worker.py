@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+NLU_EXECUTOR = os.environ.get("CHATBOT_NLU_EXECUTOR", "thread")  # "thread" or "process"
+NLU_WORKERS = int(os.environ.get("CHATBOT_NLU_WORKERS", str(os.cpu_count() or 1)))
+NLU_MAX_PENDING = int(os.environ.get("CHATBOT_NLU_MAX_PENDING", str(NLU_WORKERS * 4)))
+NLU_QUEUE_TIMEOUT = float(os.environ.get("CHATBOT_NLU_QUEUE_TIMEOUT", "10"))
+
+class NLUBusyError(RuntimeError):
+    """Raised when a request waited longer than the queue timeout for a free NLU slot."""
+
+# Components extract_entities reads; built once per worker process
+NLU_COMPONENTS = ("spelling_model", "matcher", "phrase_automaton", "vocabulary", "documents", "bm25", "faiss_index", "embedding_model")
+
+def _init_worker():
+    from app_context import context, warm_up
+    # A forked worker inherits the parent's pooled MySQL sockets; it must open its own
+    context.reset(["db_pools"])
+    warm_up(NLU_COMPONENTS)
+    # The catalog is refreshed only in the parent, which restarts the workers after a change
+
+def run_nlu(query):
+    from pattern import extract_entities
+    return extract_entities(query)
+
+class NLUWorkerPool:
+
+    """
+        Runs the CPU-bound NLU stage off the event loop with bounded concurrency.
+
+        At most max_pending requests are queued or running; further callers wait up to
+        queue_timeout seconds for a slot and then get NLUBusyError instead of piling up.
+
+        Args:
+            kind (str): "thread" (shares the already loaded models) or "process" (one model copy per core).
+            workers (int): Number of worker threads/processes.
+            max_pending (int): Maximum requests queued or running at once.
+            queue_timeout (float): Seconds a request may wait for a slot.
+    """
+
+    def __init__(self, kind=NLU_EXECUTOR, workers=NLU_WORKERS, max_pending=NLU_MAX_PENDING, queue_timeout=NLU_QUEUE_TIMEOUT):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()  # Submissions vs. restart() swapping the process pool
+
+    def _get_slots(self):
+        if self._slots is None:  # Created lazily so it binds to the running event loop
+            self._slots = asyncio.Semaphore(self.max_pending)
+        return self._slots
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="nlu")
+        return self._executor
+
+    async def _run(self, get_executor, fn, *args):
+        slots = self._get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise NLUBusyError(f"NLU queue full ({self.max_pending} pending)") from None
+        try:
+            with self._lock:
+                executor = get_executor()
+                if isinstance(executor, ThreadPoolExecutor):
+                    # Carry the turn's trace into the worker thread
+                    fn = functools.partial(contextvars.copy_context().run, fn)
+                future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+            return await future
+        finally:
+            slots.release()
+
+    async def extract_entities(self, query):
+        return await self._run(self._get_executor, run_nlu, query)
+
+    def warm_up(self):
+        # Starts every worker process now instead of on the first request
+        if self.kind == "process":
+            executor = self._get_executor()
+            for future in [executor.submit(run_nlu, "") for _ in range(self.workers)]:
+                future.result()
+
+    def restart(self):
+        """
+            Replaces the worker processes so they fork from the parent's current catalog (call after
+            a catalog refresh). Requests already running finish on the old workers.
+        """
+        if self.kind != "process" or self._executor is None:
+            return  # Threads already see the refreshed components
+        executor = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        for future in [executor.submit(run_nlu, "") for _ in range(self.workers)]:
+            future.result()
+        with self._lock:
+            old, self._executor = self._executor, executor
+            old.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+nlu_pool = NLUWorkerPool()
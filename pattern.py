@@ -1,40 +1,106 @@
+import logging
+import os
 import spacy
 from spacy.matcher import PhraseMatcher
-from preprocess import get_best_match, process_input_with_spelling_correction
-from entity_fetch import makers_list, models_list, variants_list, years_list, fuel_type_list, category_list, sub_category_list
+from spacy.tokens import DocBin
+from app_context import context
+import entity_fetch  # noqa: F401  (registers the catalog list components)
+from artifact_cache import cached_object, content_hash
+from preprocess import get_best_matches_batch, process_inputs_with_spelling_correction
+from retrieval import hybrid_search_batch, resolve_entities
+from telemetry import timed
+
+logger = logging.getLogger(__name__)
+
+# "matcher" (spelling correction + spaCy PhraseMatcher) or "automaton" (one fuzzy pass, see phrase_automaton.py)
+EXTRACTOR = os.environ.get("CHATBOT_EXTRACTOR", "matcher")
 
 STOP_WORDS = {"are", "there", "is", "do", "you", "have", "for", "the", "a", "an", "of", "in", "to", "and", "on", "at", "by"}
 
 nlp = spacy.blank("en")
-matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
 
-entity_dict = {
-    "MAKE": makers_list, "MODEL": models_list, "VARIANT": variants_list, 
-    "YEAR": years_list, "FUEL_TYPE": fuel_type_list, 
-    "CATEGORY": category_list, "SUB_CATEGORY": sub_category_list
-}
+# Entity type -> catalog list component
+ENTITY_LISTS = {entity_type: list_name for list_name, entity_type in entity_fetch.ENTITY_TYPES.items()}
 
 def create_patterns(phrase_list):
     return [nlp.make_doc(phrase.lower()) for phrase in phrase_list if phrase]
 
-for entity_type, entity_list in entity_dict.items():
-    if entity_list:
-        matcher.add(entity_type, create_patterns(entity_list))
-
-def extract_entities(query):
-    words = query.split()
-    filtered_words = [word for word in words if word.lower() not in STOP_WORDS]
-    cleaned_query = " ".join(filtered_words)
-    
-    corrected_query = process_input_with_spelling_correction(cleaned_query)
-    print(f"Debug - Filtered and corrected query: '{corrected_query}'")
-    
-    doc = nlp(corrected_query)
-    matches = matcher(doc)
-    entities = {nlp.vocab.strings[m_id]: doc[start:end].text for m_id, start, end in matches}
-    
-    if not entities:
-        best_match = get_best_match(corrected_query)
-        if best_match:
-            return {"UNKNOWN": best_match}
-    return entities
\ No newline at end of file
+def load_patterns(entity_type, phrase_list):
+    # Tokenized patterns are cached per entity type, so only changed lists are re-tokenized.
+    data = cached_object(
+        f"patterns-{entity_type}", content_hash(spacy.__version__, phrase_list),
+        lambda: DocBin(docs=create_patterns(phrase_list)).to_bytes()
+    )
+    return list(DocBin().from_bytes(data).get_docs(nlp.vocab))
+
+def _build_entity_dict():
+    return {entity_type: context.get(list_name) for entity_type, list_name in ENTITY_LISTS.items()}
+
+def build_matcher(entity_dict, pattern_docs=None):
+    """Builds the phrase matcher; pattern_docs ({entity type: docs}) replaces load_patterns for those types."""
+    pattern_docs = pattern_docs or {}
+    matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+    for entity_type, entity_list in entity_dict.items():
+        docs = pattern_docs[entity_type] if entity_type in pattern_docs else load_patterns(entity_type, entity_list) if entity_list else []
+        if docs:
+            matcher.add(entity_type, docs)
+    return matcher
+
+def _build_matcher():
+    return build_matcher(context.get("entity_dict"))
+
+context.register("entity_dict", _build_entity_dict, deps=tuple(ENTITY_LISTS.values()))
+context.register("matcher", _build_matcher, deps=("entity_dict",))
+
+def __getattr__(name):
+    if name in ("entity_dict", "matcher"):
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def extract_entities(query, with_confidence=False):
+    return extract_entities_batch([query], with_confidence)[0]
+
+def extract_entities_batch(queries, with_confidence=False):
+    """
+        extract_entities for many queries at once: spelling correction, spaCy tokenization,
+        hybrid retrieval and the BM25 fallback each run once for the whole batch.
+
+        with_confidence=True returns (entities, {entity type: confidence}) pairs instead; only the
+        automaton extractor scores its matches, so the other paths report no confidences.
+    """
+    cleaned_queries = [" ".join(word for word in query.split() if word.lower() not in STOP_WORDS) for query in queries]
+
+    if EXTRACTOR == "automaton":
+        # The raw query is scanned once; spelling correction is only needed for the fallbacks
+        with timed("phrase_automaton"):
+            automaton = context.get("phrase_automaton")
+            extracted = [automaton.extract_with_confidence(query) for query in queries]
+            results = [entities for entities, _ in extracted]
+            confidences = [query_confidences for _, query_confidences in extracted]
+        misses = [i for i, entities in enumerate(results) if not entities]
+        corrected_queries = dict(zip(misses, process_inputs_with_spelling_correction([cleaned_queries[i] for i in misses])))
+    else:
+        confidences = [{} for _ in queries]
+        corrected_queries = process_inputs_with_spelling_correction(cleaned_queries)
+        with timed("phrase_matching"):
+            matcher = context.get("matcher")
+            results = []
+            for doc in nlp.pipe(corrected_queries):
+                results.append({nlp.vocab.strings[m_id]: doc[start:end].text for m_id, start, end in matcher(doc)})
+        misses = [i for i, entities in enumerate(results) if not entities]
+    logger.debug("Filtered and corrected queries: %r", corrected_queries)
+
+    # Dense + BM25 retrieval resolves typed entities the phrase matching missed
+    if misses:
+        with timed("hybrid_retrieval"):
+            for i, candidates in zip(misses, hybrid_search_batch([corrected_queries[i] for i in misses])):
+                results[i] = resolve_entities(candidates)
+        misses = [i for i in misses if not results[i]]
+    if misses:
+        with timed("bm25_fallback"):
+            for i, matches in zip(misses, get_best_matches_batch([corrected_queries[i] for i in misses], k=1)):
+                if matches and matches[0][1] > 0.5:
+                    results[i] = {"UNKNOWN": matches[0][0]}
+    if with_confidence:
+        return list(zip(results, confidences))
+    return results
@@ -0,0 +1,146 @@
+from bisect import bisect_left
+from app_context import context
+import vocabulary as _vocabulary  # noqa: F401  (registers the vocabulary component)
+from preprocess import STOP_WORDS
+
+INF = 1 << 30
+PUNCTUATION = "?!,.;:\"'()"
+
+def allowed_distance(length, max_distance=2):
+    # Short terms must match exactly, otherwise "for" would be read as "ford"
+    if length <= 4:
+        return 0
+    return min(max_distance, 1 if length <= 8 else 2)
+
+def _common_prefix(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+class PhraseAutomaton:
+
+    """
+        Fuzzy longest-match extractor over every catalog phrase at once.
+
+        The phrases are kept as one sorted list that is walked like a trie: consecutive phrases
+        share the edit-distance rows of their common prefix, and a dead prefix (every cell over
+        max_distance) skips all phrases below it with one bisect. From each token start in the
+        query, the walk finds every phrase ending on a token boundary within its allowed number
+        of edits (optimal string alignment, so transpositions count once). Multi-word phrases are
+        matched as a whole, including a missing or extra space.
+
+        The first character must match, which keeps the walk small and is rarely the typo.
+
+        Args:
+            vocabulary (Vocabulary): Terms and their entity types.
+            max_distance (int): Upper bound on edits for any phrase.
+    """
+
+    def __init__(self, vocabulary, max_distance=2):
+        self.vocabulary = vocabulary
+        self.max_distance = max_distance
+        order = sorted(range(len(vocabulary)), key=vocabulary.terms.__getitem__)
+        self.phrases = [vocabulary.terms[i] for i in order]
+        self.term_ids = order  # Position in self.phrases -> vocabulary id
+        self.max_length = max((len(p) for p in self.phrases), default=0)
+
+    def _scan(self, text, start, matches):
+        rest = text[start:start + self.max_length + self.max_distance]
+        n = len(rest)
+        K = self.max_distance
+        # Only phrases starting with the same character are walked
+        lo = bisect_left(self.phrases, rest[0])
+        hi = bisect_left(self.phrases, chr(ord(rest[0]) + 1))
+        root = [j if j <= K else INF for j in range(n + 1)]
+        rows = [root]  # rows[d]: distances between the phrase prefix of length d and rest[:j]
+        previous = ""
+        k = lo
+        while k < hi:
+            phrase = self.phrases[k]
+            del rows[_common_prefix(phrase, previous) + 1:]
+            previous = phrase
+            dead = False
+            for d in range(len(rows), len(phrase) + 1):
+                char, prev, row = phrase[d - 1], rows[d - 1], [INF] * (n + 1)
+                if d <= K:
+                    row[0] = d
+                for j in range(max(1, d - K), min(n, d + K) + 1):
+                    cost = prev[j - 1] + (rest[j - 1] != char)
+                    if prev[j] + 1 < cost:
+                        cost = prev[j] + 1
+                    if row[j - 1] + 1 < cost:
+                        cost = row[j - 1] + 1
+                    if d > 1 and j > 1 and rest[j - 1] == phrase[d - 2] and rest[j - 2] == char and rows[d - 2][j - 2] + 1 < cost:
+                        cost = rows[d - 2][j - 2] + 1  # Transposition
+                    row[j] = cost
+                if min(row) > K:
+                    # No phrase below this prefix can match: skip them all
+                    k = bisect_left(self.phrases, phrase[:d - 1] + chr(ord(char) + 1), k + 1, hi)
+                    dead = True
+                    break
+                rows.append(row)
+            if dead:
+                continue
+
+            row, limit = rows[len(phrase)], allowed_distance(len(phrase), K)
+            for j in range(max(1, len(phrase) - limit), min(n, len(phrase) + limit) + 1):
+                if row[j] <= limit and (j == n or rest[j] == " "):
+                    span = rest[:j]
+                    if row[j] and span in STOP_WORDS:
+                        continue  # A stop word is never a typo of a catalog term
+                    matches.append((start, start + j, k, row[j]))
+            k += 1
+
+    def find(self, query):
+        """
+            Returns typed, non-overlapping, longest-first spans in the normalized query as dicts with
+            "type", "value" (catalog term), "text" (matched query text), "start", "end" and "confidence".
+        """
+        text = " ".join(token.strip(PUNCTUATION) for token in query.lower().split())
+        text = " ".join(text.split())
+        matches = []
+        if self.phrases:
+            for start in range(len(text)):
+                if start == 0 or text[start - 1] == " ":
+                    self._scan(text, start, matches)
+
+        # Longest (edit-adjusted) spans first, exact before fuzzy
+        matches.sort(key=lambda m: (-(m[1] - m[0] - m[3]), m[3], m[0]))
+        taken = [False] * (len(text) + 1)
+        spans = []
+        for start, end, k, distance in matches:
+            if any(taken[start:end]):
+                continue
+            term_id = self.term_ids[k]
+            phrase = self.phrases[k]
+            types = self.vocabulary.types_of(term_id)
+            if not types:
+                continue  # Removed from the catalog
+            taken[start:end] = [True] * (end - start)
+            confidence = 1.0 - distance / len(phrase)
+            for entity_type in types:
+                spans.append({"type": entity_type, "value": phrase, "text": text[start:end], "start": start, "end": end, "confidence": confidence})
+        spans.sort(key=lambda s: s["start"])
+        return spans
+
+    def extract_with_confidence(self, query):
+        """({entity type: value}, {entity type: confidence}); the most confident span wins per type."""
+        entities, confidences = {}, {}
+        for span in self.find(query):
+            if span["confidence"] > confidences.get(span["type"], -1.0):
+                entities[span["type"]] = span["value"]
+                confidences[span["type"]] = span["confidence"]
+        return entities, confidences
+
+    def extract(self, query):
+        """{entity type: value} like pattern.extract_entities."""
+        return self.extract_with_confidence(query)[0]
+
+context.register("phrase_automaton", lambda: PhraseAutomaton(context.get("vocabulary")), deps=("vocabulary",))
+
+def __getattr__(name):
+    if name == "phrase_automaton":
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,43 @@
-from difflib import get_close_matches
-from nltk.corpus import stopwords
-from nlp_setup import documents, bm25
-from missplet_model import correct_spelling
-import numpy as np
+from app_context import context
+import nlp_setup  # noqa: F401  (registers the document and index components)
+from telemetry import timed
+from missplet_model import correct_spelling_batch
+from fuzzy_index import get_fuzzy_index
 
 STOP_WORDS = {"are", "there", "is", "do", "you", "have", "for", "the", "a", "an", "of", "in", "to", "and", "on", "at", "by"}
 
 def find_closest_match(word, word_list, cutoff=0.5):
-    matches = get_close_matches(word, word_list, n=1, cutoff=cutoff)
-    return matches[0] if matches else word
+    match = get_fuzzy_index(word_list).closest(word, cutoff)
+    return match if match is not None else word
+
+def process_inputs_with_spelling_correction(input_texts):
+    # All non-stopword tokens of every text are corrected in a single batch
+    tokenized = [text.split() for text in input_texts]
+    with timed("spelling_correction"):
+        corrections = iter(correct_spelling_batch(
+            [word for words in tokenized for word in words if word.lower() not in STOP_WORDS]
+        ))
+
+    results = []
+    for words in tokenized:
+        corrected_words = [word if word.lower() in STOP_WORDS else next(corrections) for word in words]
+        results.append(" ".join(corrected_words).strip().lower())
+    return results
 
 def process_input_with_spelling_correction(input_text):
-    words = input_text.split()
-    corrected_words = []
-    
-    for word in words:
-        if word.lower() in STOP_WORDS:
-            corrected_words.append(word)
-        else:
-            corrected_words.append(correct_spelling(word))
-            
-    return " ".join(corrected_words).strip().lower()
+    return process_inputs_with_spelling_correction([input_text])[0]
+
+def get_best_matches(query, k=5):
+    return get_best_matches_batch([query], k)[0]
+
+def get_best_matches_batch(queries, k=5):
+    vocabulary, bm25 = context.get_many("vocabulary", "bm25")
+    type_masks = vocabulary.type_masks
+    return [
+        [(vocabulary.terms[doc_id], score) for doc_id, score in matches if type_masks[doc_id]]  # Skips removed terms
+        for matches in bm25.top_k_batch([query.split() for query in queries], k)
+    ]
 
 def get_best_match(query):
-    scores = bm25.get_scores(query.split())
-    best_index = np.argmax(scores)
-    return documents[best_index] if scores[best_index] > 0.5 else None
\ No newline at end of file
+    matches = get_best_matches(query, 1)
+    return matches[0][0] if matches and matches[0][1] > 0.5 else None
@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+class SemanticResponseCache:
+
+    """
+        Cache of LLM-enhanced answers keyed by the database answer plus the meaning of the question.
+
+        A cached response is reused when the normalized database answer is identical and the
+        new query's embedding has cosine similarity >= threshold with the cached query's.
+
+        Args:
+            encode (callable): Maps a query string to an embedding vector.
+            threshold (float): Minimum cosine similarity between queries for a hit.
+            maxsize (int): Maximum number of cached responses (least recently used are dropped).
+            ttl (float): Seconds a cached response stays valid.
+    """
+
+    def __init__(self, encode, threshold=0.9, maxsize=2048, ttl=3600):
+        self.encode = encode
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.size = 0
+        self._entries = OrderedDict()  # normalized answer -> [(query embedding, response, expires_at)]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(response_text):
+        return " ".join(response_text.lower().split())
+
+    def _embed(self, user_query):
+        embedding = np.asarray(self.encode(user_query), dtype=np.float32)
+        return embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+
+    def lookup(self, user_query, response_text):
+        key = self.normalize(response_text)
+        with self._lock:
+            if key not in self._entries:  # No generation for this answer yet: skip the query encode
+                self.misses += 1
+                return None
+        embedding = self._embed(user_query)
+        now = time.monotonic()
+        with self._lock:
+            entries = [e for e in self._entries.get(key, []) if e[2] > now]
+            self.size -= len(self._entries.get(key, [])) - len(entries)
+            if entries:
+                self._entries[key] = entries
+                self._entries.move_to_end(key)
+                similarities = np.stack([e[0] for e in entries]) @ embedding
+                best = int(similarities.argmax())
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    return entries[best][1]
+            else:
+                self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def store(self, user_query, response_text, response):
+        if self.maxsize <= 0 or not response:
+            return
+        key = self.normalize(response_text)
+        embedding = self._embed(user_query)
+        with self._lock:
+            self._entries.setdefault(key, []).append((embedding, response, time.monotonic() + self.ttl))
+            self._entries.move_to_end(key)
+            self.size += 1
+            while self.size > self.maxsize:
+                oldest_key, oldest = next(iter(self._entries.items()))
+                oldest.pop(0)
+                self.size -= 1
+                if not oldest:
+                    del self._entries[oldest_key]
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "hits": self.hits, "misses": self.misses}
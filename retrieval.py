@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from app_context import context
+from embedding_store import embedding_store
+import nlp_setup  # noqa: F401  (registers the FAISS and BM25 components)
+
+RRF_K = 60  # Reciprocal rank fusion constant
+DENSE_MIN_SIMILARITY = float(os.environ.get("CHATBOT_DENSE_MIN_SIMILARITY", "0.6"))
+BM25_MIN_SCORE = 0.5
+
+def embed_query(query):
+    return embed_queries([query])[0]
+
+def embed_queries(queries):
+    """Embeds queries through the shared embedding store (catalog rows, LRU cache, one batch for misses)."""
+    return list(embedding_store.encode(list(queries)))
+
+def hybrid_search(query, k=5):
+    """
+        Queries FAISS and BM25 together and fuses their rankings with reciprocal rank fusion.
+
+        Returns up to k candidates, best first, as dicts with the document "value", its entity
+        "type", the fused "score", and the raw "dense" cosine similarity and "bm25" score.
+    """
+    return hybrid_search_batch([query], k)[0]
+
+def hybrid_search_batch(queries, k=5):
+    """hybrid_search for many queries with one encode call, one FAISS search and one BM25 pass."""
+    if not queries:
+        return []
+    # One consistent snapshot, so a catalog refresh cannot swap the indexes mid-query
+    vocabulary, faiss_index, bm25 = context.get_many("vocabulary", "faiss_index", "bm25")
+    all_distances, all_ids = faiss_index.search(np.stack(embed_queries(queries)), k * 2)
+    all_bm25 = bm25.top_k_batch([query.split() for query in queries], k * 2)
+
+    results = []
+    for ids, distances, bm25_matches in zip(all_ids, all_distances, all_bm25):
+        candidates = {}  # doc (term) id -> one candidate per entity type of the term
+
+        def candidate_entries(doc_id):
+            if doc_id not in candidates:
+                term = vocabulary.terms[doc_id]
+                # Removed terms have no types left and produce no candidates
+                candidates[doc_id] = [
+                    {"value": term, "type": entity_type, "score": 0.0, "dense": None, "bm25": None}
+                    for entity_type in vocabulary.types_of(doc_id)
+                ]
+            return candidates[doc_id]
+
+        for rank, (doc_id, distance) in enumerate(zip(ids, distances)):
+            if doc_id < 0:
+                continue
+            for entry in candidate_entries(int(doc_id)):
+                entry["dense"] = 1.0 - float(distance) / 2.0  # Squared L2 -> cosine; the embeddings are unit-normalized
+                entry["score"] += 1.0 / (RRF_K + rank + 1)
+
+        for rank, (doc_id, score) in enumerate(bm25_matches):
+            for entry in candidate_entries(doc_id):
+                entry["bm25"] = score
+                entry["score"] += 1.0 / (RRF_K + rank + 1)
+
+        entries = [entry for entries in candidates.values() for entry in entries]
+        results.append(sorted(entries, key=lambda c: c["score"], reverse=True)[:k])
+    return results
+
+def resolve_entities(candidates):
+    """Keeps the best confident candidate per entity type: {type: value}."""
+    entities = {}
+    for c in candidates:
+        confident = (c["dense"] is not None and c["dense"] >= DENSE_MIN_SIMILARITY) or (c["bm25"] is not None and c["bm25"] > BM25_MIN_SCORE)
+        if confident and c["type"] not in entities:
+            entities[c["type"]] = c["value"]
+    return entities
@@ -0,0 +1,174 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+class SQLiteSessionStore:
+
+    """
+        On-disk session backend: one JSON document per session in a SQLite table.
+
+        Args:
+            path (str): SQLite database file.
+            retention (float): Seconds after which untouched sessions are purged on startup.
+    """
+
+    def __init__(self, path, retention=7 * 24 * 3600):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)")
+        self._lock = threading.Lock()
+        self.purge(time.time() - retention)
+
+    def get(self, session_id):
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id, data):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data), time.time())
+            )
+
+    def delete(self, session_id):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge(self, before):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (before,))
+
+class SessionStore:
+
+    """
+        Bounded in-memory session store with LRU and idle-TTL eviction.
+
+        Sessions are plain JSON-serializable dicts handed out by reference. When a backend is
+        configured, evicted sessions are spilled to it and restored transparently on the next
+        get(), and save() writes a session through so it survives a restart. Sessions inside
+        turn() are pinned: they are not evicted until the turn has finished and saved them.
+
+        Args:
+            max_sessions (int): Maximum number of sessions kept in memory.
+            idle_ttl (float): Seconds of inactivity after which a session is evicted.
+            max_bytes (int): Optional bound on the summed JSON size of in-memory sessions.
+            backend (SQLiteSessionStore): Optional on-disk store for cold sessions.
+    """
+
+    def __init__(self, max_sessions=1000, idle_ttl=1800, max_bytes=None, backend=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.total_bytes = 0
+        self._sessions = OrderedDict()  # session_id -> [data, last_access, size], least recently used first
+        self._pinned = Counter()  # session_id -> turns in flight
+        self._lock = threading.RLock()
+
+    def get(self, session_id):
+        """Returns the session dict, restoring it from the backend or creating an empty one."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                data = self.backend.get(session_id) if self.backend else None
+                entry = self._insert(session_id, data if data is not None else {})
+            else:
+                self._sessions.move_to_end(session_id)
+            entry[1] = time.monotonic()
+            self._evict()
+            return entry[0]
+
+    def reset(self, session_id):
+        """Replaces the session with an empty dict and returns it."""
+        with self._lock:
+            self._remove(session_id)
+            if self.backend:
+                self.backend.delete(session_id)
+            entry = self._insert(session_id, {})
+            self._evict()
+            return entry[0]
+
+    def save(self, session_id):
+        """Updates size accounting for a session after a turn and writes it through to the backend."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return
+            serialized = json.dumps(entry[0])
+            self.total_bytes += len(serialized) - entry[2]
+            entry[2] = len(serialized)
+            if self.backend:
+                self.backend.set(session_id, entry[0])
+            self._evict()
+
+    @contextmanager
+    def turn(self, session_id):
+        """Pins the session while a turn runs, so changes made mid-turn cannot be evicted, and saves it afterwards."""
+        with self._lock:
+            self._pinned[session_id] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pinned[session_id] -= 1
+                if not self._pinned[session_id]:
+                    del self._pinned[session_id]
+                self.save(session_id)
+
+    def flush(self):
+        """Writes every in-memory session to the backend (e.g. on shutdown)."""
+        with self._lock:
+            if self.backend:
+                for session_id, (data, _, _) in self._sessions.items():
+                    self.backend.set(session_id, data)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._sessions), "bytes": self.total_bytes}
+
+    def _insert(self, session_id, data):
+        entry = self._sessions[session_id] = [data, time.monotonic(), len(json.dumps(data))]
+        self.total_bytes += entry[2]
+        return entry
+
+    def _remove(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
+        return entry
+
+    def _evict(self):
+        # The most recently used session is never evicted, so get() always returns a live dict,
+        # and neither are pinned ones (their turn still holds the dict and will save it).
+        now = time.monotonic()
+        newest = next(reversed(self._sessions), None)
+        while len(self._sessions) > 1:
+            session_id = next((s for s in self._sessions if s not in self._pinned), newest)
+            if session_id == newest:
+                break
+            data, last_access, _ = self._sessions[session_id]
+            over_limit = len(self._sessions) > self.max_sessions or (self.max_bytes and self.total_bytes > self.max_bytes)
+            if not over_limit and now - last_access < self.idle_ttl:
+                break
+            self._remove(session_id)
+            if self.backend:
+                self.backend.set(session_id, data)  # Spill the cold session to disk
+
+def create_session_store():
+    """Builds the store from the CHATBOT_SESSION_* environment variables."""
+    path = os.environ.get("CHATBOT_SESSION_DB")
+    max_bytes = os.environ.get("CHATBOT_SESSION_MAX_BYTES")
+    store = SessionStore(
+        max_sessions=int(os.environ.get("CHATBOT_SESSION_MAX", "1000")),
+        idle_ttl=float(os.environ.get("CHATBOT_SESSION_IDLE_TTL", "1800")),
+        max_bytes=int(max_bytes) if max_bytes else None,
+        backend=SQLiteSessionStore(path) if path else None,
+    )
+    if store.backend:
+        atexit.register(store.flush)
+    return store
@@ -0,0 +1,93 @@
+import argparse
+import random
+import time
+import tracemalloc
+from missplet_model import correct_words, generate_misspellings, train_model
+from vocabulary import vocabulary
+from symspell import build_symspell
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyz"
+
+def _random_edit(word, rng):
+    i = rng.randrange(len(word))
+    op = rng.choice(("delete", "insert", "substitute", "transpose"))
+    if op == "delete":
+        return word[:i] + word[i + 1:]
+    if op == "insert":
+        return word[:i] + rng.choice(ALPHABET) + word[i:]
+    if op == "substitute":
+        return word[:i] + rng.choice(ALPHABET.replace(word[i], "")) + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+def held_out_pairs(words, count, seed=0):
+    """
+        (misspelling, term) pairs from a different edit model than the KNN training data: one random
+        deletion, insertion, substitution or transposition anywhere in the term. Misspellings that
+        generate_misspellings() would produce, or that are catalog terms, are skipped, so the KNN
+        is never scored on its own training pairs.
+    """
+    rng = random.Random(seed)
+    terms = [word for word in dict.fromkeys(words) if len(word) > 3]
+    known = set(words)
+    training = {}  # term -> its training misspellings, generated on demand
+    pairs = []
+    for _ in range(count * 20):
+        if len(pairs) == count or not terms:
+            break
+        term = rng.choice(terms)
+        wrong = _random_edit(term, rng)
+        if term not in training:
+            training[term] = set(generate_misspellings(term))
+        if wrong not in known and wrong not in training[term]:
+            pairs.append((wrong, term))
+    return pairs
+
+def _build(name, build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    model = build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name}: built in {elapsed:.2f}s, peak memory {peak / 1e6:.1f} MB")
+    return model
+
+def _evaluate(name, correct_batch, pairs):
+    wrong_words = [wrong for wrong, _ in pairs]
+
+    start = time.perf_counter()
+    predictions = correct_batch(wrong_words)
+    batch_elapsed = time.perf_counter() - start
+
+    # Single-word calls, as issued by the chat loop
+    sample = wrong_words[:min(len(wrong_words), 500)]
+    start = time.perf_counter()
+    for word in sample:
+        correct_batch([word])
+    single_elapsed = time.perf_counter() - start
+
+    accuracy = sum(p == right for p, (_, right) in zip(predictions, pairs)) / len(pairs)
+    print(
+        f"{name}: accuracy {accuracy:.3f}, "
+        f"batch {batch_elapsed / len(pairs) * 1e6:.1f} us/word, "
+        f"single {single_elapsed / len(sample) * 1e6:.1f} us/word"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the KNN and SymSpell spelling engines on held-out misspelling pairs.")
+    parser.add_argument("--sample", type=int, default=5000, help="number of misspelling pairs to evaluate")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pairs = held_out_pairs(correct_words, args.sample, args.seed)
+    print(f"Evaluating on {len(pairs)} held-out pairs from {len(correct_words)} catalog terms")
+
+    vectorizer, knn = _build("knn", lambda: train_model(correct_words, vocabulary))
+    symspell = _build("symspell", lambda: build_symspell(correct_words))
+
+    _evaluate("knn", lambda words: [vocabulary.terms[i] for i in knn.predict(vectorizer.transform(words))], pairs)
+    _evaluate("symspell", lambda words: [s or w for w, s in zip(words, symspell.lookup_batch(words))], pairs)
+
+if __name__ == "__main__":
+    main()
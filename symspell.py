@@ -0,0 +1,89 @@
+from collections import defaultdict
+
+def osa_distance(a, b, max_distance):
+    """Optimal string alignment distance (Levenshtein plus adjacent transpositions), or max_distance + 1 if larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class SymSpell:
+
+    """
+        Spelling corrector based on a precomputed deletion index (symmetric delete algorithm).
+
+        Every dictionary term is indexed under all strings obtained by deleting up to
+        max_edit_distance characters from its prefix. A query generates its own deletes and
+        only the terms sharing one are verified with an edit-distance check, so lookup cost
+        does not depend on dictionary size.
+
+        Args:
+            max_edit_distance (int): Largest edit distance at which a correction is suggested.
+            prefix_length (int): Number of leading characters used to generate deletes.
+    """
+
+    def __init__(self, max_edit_distance=2, prefix_length=7):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.term_counts = {}  # term -> frequency weight
+        self.deletes = defaultdict(list)  # delete string -> terms
+
+    def _edits(self, word, max_distance):
+        # All strings reachable from word by deleting up to max_distance characters
+        edits = {word}
+        frontier = {word}
+        for _ in range(max_distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))} - edits
+            edits |= frontier
+        return edits
+
+    def add_term(self, term, count=1):
+        if term in self.term_counts:
+            self.term_counts[term] += count
+            return
+        self.term_counts[term] = count
+        for delete in self._edits(term[:self.prefix_length], self.max_edit_distance):
+            self.deletes[delete].append(term)
+
+    def _max_distance(self, word):
+        # Short words tolerate fewer edits, otherwise almost anything would match them
+        return min(self.max_edit_distance, max(1, len(word) // 3))
+
+    def lookup(self, word):
+        """Returns the closest term by (edit distance, -frequency), or None if nothing is within range."""
+        if word in self.term_counts:
+            return word
+        max_distance = self._max_distance(word)
+        candidates = set()
+        for delete in self._edits(word[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        best = None
+        best_key = None
+        for term in candidates:
+            distance = osa_distance(word, term, max_distance)
+            if distance <= max_distance:
+                key = (distance, -self.term_counts[term], term)
+                if best_key is None or key < best_key:
+                    best, best_key = term, key
+        return best
+
+    def lookup_batch(self, words):
+        return [self.lookup(word) for word in words]
+
+def build_symspell(words, max_edit_distance=2):
+    symspell = SymSpell(max_edit_distance)
+    for word in words:
+        symspell.add_term(word)  # Terms listed under several entity types get a higher weight
+    return symspell
@@ -0,0 +1,155 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.environ.get("CHATBOT_METRICS", "1") != "0"
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+def configure_logging():
+    """Sets the root log level from CHATBOT_LOG_LEVEL (default WARNING, so debug output costs nothing)."""
+    logging.basicConfig(
+        level=os.environ.get("CHATBOT_LOG_LEVEL", "WARNING").upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+
+    """
+        In-process counters and latency histograms, rendered in the Prometheus text format.
+
+        Series are identified by a metric name plus a tuple of (label, value) pairs.
+    """
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauge_sources = []  # Callables returning {(name, ((label, value), ...)): value}, read at render time
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def add_gauge_source(self, source):
+        self.gauge_sources.append(source)
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (n, labels), value in self.counters.items():
+                    if n == name:
+                        lines.append(f"{name}{self._labels(labels)} {value}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), h in self.histograms.items():
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(list(h.buckets) + ["+Inf"], h.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {h.total}")
+                    lines.append(f"{name}_count{self._labels(labels)} {h.count}")
+        for source in self.gauge_sources:
+            for (name, labels), value in source().items():
+                lines.append(f"{name}{self._labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+# Per-turn trace: a list of spans collected by every timed() block running in the turn's context
+_current_trace = contextvars.ContextVar("chatbot_trace", default=None)
+
+def start_trace():
+    trace = {"start": time.perf_counter(), "spans": []}
+    _current_trace.set(trace)
+    return trace
+
+def end_trace():
+    """Finishes the current turn's trace, logs it at DEBUG level and returns it."""
+    trace = _current_trace.get()
+    _current_trace.set(None)
+    if trace is None:
+        return None
+    trace["seconds"] = time.perf_counter() - trace["start"]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("turn trace %s", json.dumps(trace["spans"]))
+    return trace
+
+@contextmanager
+def timed(stage, **labels):
+    """Records the duration of the block in the chatbot_stage_seconds histogram and the current trace."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("chatbot_stage_seconds", elapsed, stage=stage, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace["spans"].append({"stage": stage, **labels, "offset_ms": (start - trace["start"]) * 1000, "ms": elapsed * 1000})
+
+def count(name, value=1, **labels):
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port):
+    """Serves /metrics on a background thread."""
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,88 @@
+import sys
+import numpy as np
+from app_context import context
+from entity_fetch import ENTITY_TYPES
+
+# Bit i of a type mask stands for ENTITY_TYPE_NAMES[i]
+ENTITY_TYPE_NAMES = tuple(ENTITY_TYPES.values())
+
+class Vocabulary:
+
+    """
+        Interned catalog terms with integer ids and a bitmask of the entity types of each term.
+
+        A term listed under several entity types is stored once. Ids are positions in `terms`
+        and never change: new terms are appended and a removed term keeps its id with an empty
+        type mask, so the BM25 and FAISS indexes (whose document ids are term ids) stay valid.
+
+        Args:
+            type_names (tuple): Entity types, one mask bit each (at most 16).
+    """
+
+    def __init__(self, type_names=ENTITY_TYPE_NAMES):
+        self.type_names = tuple(type_names)
+        self.type_bits = {name: 1 << i for i, name in enumerate(self.type_names)}
+        self.terms = []  # id -> interned term
+        self.ids = {}  # term -> id
+        self._masks = np.zeros(64, dtype=np.uint16)  # Grown by doubling
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term):
+        term_id = self.ids.get(term)
+        return term_id is not None and self._masks[term_id] != 0
+
+    @property
+    def type_masks(self):
+        return self._masks[:len(self.terms)]
+
+    def add(self, term, entity_type):
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            if term_id == len(self._masks):
+                self._masks = np.concatenate([self._masks, np.zeros_like(self._masks)])
+            term = sys.intern(term)
+            self.terms.append(term)
+            self.ids[term] = term_id
+        self._masks[term_id] |= self.type_bits[entity_type]
+        return term_id
+
+    def remove(self, term, entity_type):
+        term_id = self.ids.get(term)
+        if term_id is not None:
+            self._masks[term_id] &= ~np.uint16(self.type_bits[entity_type])
+
+    def id_of(self, term):
+        return self.ids.get(term)
+
+    def types_of(self, term_id):
+        mask = int(self._masks[term_id])
+        return [name for name, bit in self.type_bits.items() if mask & bit]
+
+    def ids_with_type(self, entity_type):
+        return np.flatnonzero(self.type_masks & self.type_bits[entity_type])
+
+    def copy(self):
+        """Independent copy sharing the interned strings (used to update a live vocabulary)."""
+        vocabulary = Vocabulary(self.type_names)
+        vocabulary.terms = list(self.terms)
+        vocabulary.ids = dict(self.ids)
+        vocabulary._masks = self._masks.copy()
+        return vocabulary
+
+def build_vocabulary(lists):
+    """Builds the vocabulary from {catalog list name: terms}, in ENTITY_TYPES order."""
+    vocabulary = Vocabulary()
+    for name, entity_type in ENTITY_TYPES.items():
+        for term in lists[name]:
+            vocabulary.add(term, entity_type)
+    return vocabulary
+
+context.register("vocabulary", lambda: build_vocabulary({name: context.get(name) for name in ENTITY_TYPES}), deps=tuple(ENTITY_TYPES))
+
+def __getattr__(name):
+    if name == "vocabulary":
+        return context.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")